@@ -3,34 +3,88 @@ from airplane_boarding import AirplaneEnv
 from sb3_contrib import MaskablePPO
 from sb3_contrib.common.maskable.utils import get_action_masks
 
+from stable_baselines3.common.vec_env import DummyVecEnv
 from stable_baselines3.common.vec_env.subproc_vec_env import SubprocVecEnv
 from stable_baselines3.common.env_util import make_vec_env
 from sb3_contrib.common.maskable.callbacks import  MaskableEvalCallback
+from async_eval import AsyncMaskableEvalCallback
+from autotune import load_train_config, ppo_keys, train_config_path
+from demonstrations import check_cabin, load_dataset, pretrain
 from stable_baselines3.common.callbacks import StopTrainingOnNoModelImprovement, StopTrainingOnRewardThreshold
 
 import os
+import warnings
+
+import torch
 
 model_dir = "models" #Hello
 log_dir = "logs"
 
-def train():
-
-    env = make_vec_env(AirplaneEnv, n_envs=12, env_kwargs={"num_of_rows":10, "seats_per_row":5}, vec_env_cls=SubprocVecEnv)
+def make_model(num_of_rows=10, seats_per_row=5, n_envs=12, vec_env_cls=SubprocVecEnv, device="cpu", **ppo_kwargs):
+    # Vectorized envs and the MaskablePPO model on them. train() and sweep.run_trial both build their
+    # models here, so hyperparameters found by the sweep mean the same thing in train().
+    env_kwargs = {"num_of_rows": num_of_rows, "seats_per_row": seats_per_row}
+    env = make_vec_env(AirplaneEnv, n_envs=n_envs, env_kwargs=env_kwargs, vec_env_cls=vec_env_cls)
+    return env, MaskablePPO('MlpPolicy', env, device=device, **ppo_kwargs)
+
+def train(num_of_rows=10, seats_per_row=5, n_envs=None, device=None, ent_coef=0.1, async_eval=False, bc_dataset=None,
+          vec_env_cls=None, **ppo_kwargs):
+    # Extra keyword arguments (learning_rate, n_steps, batch_size, ...) go to MaskablePPO; sweep.py searches
+    # them on models built by make_model() like this one.
+    # Settings not passed come from the host calibration written by autotune.py, if there is one.
+    if bc_dataset:
+        # Checked before any env process starts
+        dataset = load_dataset(bc_dataset)
+        check_cabin(dataset, num_of_rows, seats_per_row)
+
+    config = load_train_config() or {}
+    if config and tuple(config.get("cabin", ())) != (num_of_rows, seats_per_row):
+        # Calibrated sizes only hold for the cabin autotune.py measured
+        warnings.warn(f"{train_config_path} was calibrated on cabin {config.get('cabin')}, not "
+                      f"{num_of_rows}x{seats_per_row}; using the default training settings")
+        config = {}
+    n_envs = n_envs or config.get("n_envs", 12)
+    device = device or config.get("device", 'cuda' if torch.cuda.is_available() else 'cpu')
+    vec_env_cls = vec_env_cls or (DummyVecEnv if config.get("vec_env") == "dummy" else SubprocVecEnv)
+    for key in ppo_keys:
+        if key in config:
+            ppo_kwargs.setdefault(key, config[key])
+    if "torch_threads" in config:
+        torch.set_num_threads(config["torch_threads"])
+
+    env_kwargs = {"num_of_rows":num_of_rows, "seats_per_row":seats_per_row}
 
     # Increase ent_coef to encourage exploration, this resulted in a better solution.
-    model = MaskablePPO('MlpPolicy', env, verbose=1, device='cuda', tensorboard_log=log_dir, ent_coef=0.1)  # device  = 'cuda' if NVIDIA GPU else 'cpu'
+    env, model = make_model(num_of_rows, seats_per_row, n_envs, vec_env_cls, device, verbose=1, tensorboard_log=log_dir,
+                            ent_coef=ent_coef, **ppo_kwargs)  # device  = 'cuda' if NVIDIA GPU else 'cpu'
+
+    if bc_dataset:
+        # Warm start from expert demonstrations recorded with demonstrations.py
+        history = pretrain(model, dataset)
+        print(f"Behaviour cloning: loss {history[-1][0]:.3f}, accuracy {history[-1][1]:.1%}")
 
     reward_threshold_callback = StopTrainingOnRewardThreshold(reward_threshold=50, verbose=1)
     no_improvement_callback = StopTrainingOnNoModelImprovement(max_no_improvement_evals=5, min_evals=10, verbose=1)
     
-    eval_callback = MaskableEvalCallback(
-        env,
-        eval_freq=10_000,
-        callback_on_new_best=reward_threshold_callback,
-        callback_after_eval=no_improvement_callback,
-        verbose=1,
-        best_model_save_path=os.path.join(model_dir, 'MaskablePPO'),
-    )
+    if async_eval:
+        # Evaluate weight snapshots in a background process with its own envs, so rollouts don't pause
+        eval_callback = AsyncMaskableEvalCallback(
+            env_kwargs,
+            eval_freq=10_000,
+            callback_on_new_best=reward_threshold_callback,
+            callback_after_eval=no_improvement_callback,
+            verbose=1,
+            best_model_save_path=os.path.join(model_dir, 'MaskablePPO'),
+        )
+    else:
+        eval_callback = MaskableEvalCallback(
+            env,
+            eval_freq=10_000,
+            callback_on_new_best=reward_threshold_callback,
+            callback_after_eval=no_improvement_callback,
+            verbose=1,
+            best_model_save_path=os.path.join(model_dir, 'MaskablePPO'),
+        )
 
     """
     total_timesteps: pass in a very large number to train (almost) indefinitely.
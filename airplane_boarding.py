@@ -2,16 +2,19 @@
 import gymnasium as gym
 from gymnasium import spaces
 import pygame
-from gymnasium.envs.registration import register
+from gymnasium.envs.registration import register, registry
 from enum import Enum
+from collections import OrderedDict, deque
 import numpy as np
+from terminal_renderer import TerminalRenderer
 from boarding_strategies import make_env, random_strategy, back_to_front, front_to_back, wilma
 
-# Register the module as gym env
-register(
-    id='airplane-boarding-v0',
-    entry_point='airplane_boarding:AirplaneEnv'
-)
+# Register the module as gym env, once (main.py and new.py register their own ids)
+if 'airplane-boarding-v0' not in registry:
+    register(
+        id='airplane-boarding-v0',
+        entry_point='airplane_boarding:AirplaneEnv'
+    )
 
 class PassengerStatus(Enum):
     MOVING = 0
@@ -30,66 +33,161 @@ class PassengerStatus(Enum):
             case PassengerStatus.SEATED:
                 return "SEATED"
 
+def uniform_ticks(low, high):
+    """Duration distribution for AirplaneEnv: uniform over low..high ticks"""
+    return lambda rng, size: rng.integers(low, high + 1, size=size)
+
+def poisson_ticks(mean):
+    """Duration distribution for AirplaneEnv: at least one tick, `mean` ticks on average"""
+    return lambda rng, size: 1 + rng.poisson(mean - 1, size=size)
+
 class Passenger:
+    __slots__ = ("seat_num", "row_num", "is_holding_luggage", "status", "stow_left", "walk_ticks", "walk_left")
+
     def __init__(self, seat_num, row_num):
         self.seat_num = seat_num
         self.row_num = row_num
+        self.reset()
+
+    def reset(self, stow_ticks=1, walk_ticks=1):
         self.is_holding_luggage = True
         self.status = PassengerStatus.MOVING
+        # Ticks of STOWING at the row, and ticks needed to cross each aisle slot
+        self.stow_left = stow_ticks
+        self.walk_ticks = self.walk_left = walk_ticks
 
     def __str__(self):
         return f"P{self.seat_num:02d}"
 
 class LobbyRow:
+    __slots__ = ("row_num", "all_passengers", "passengers")
+
     def __init__(self, row_num, seats_per_row):
         self.row_num = row_num
-        self.passengers = [Passenger(row_num * seats_per_row + i, row_num) for i in range(seats_per_row)]
+        self.all_passengers = tuple(Passenger(row_num * seats_per_row + i, row_num) for i in range(seats_per_row))
+        self.passengers = list(self.all_passengers)
+
+    def reset(self):
+        self.passengers[:] = self.all_passengers
 
 class Lobby:
+    __slots__ = ("num_of_rows", "seats_per_row", "lobby_rows", "num_passengers")
+
     def __init__(self, num_of_rows, seats_per_row):
         self.num_of_rows = num_of_rows
         self.seats_per_row = seats_per_row
         self.lobby_rows = [LobbyRow(row_num, self.seats_per_row) for row_num in range(self.num_of_rows)]
+        self.num_passengers = num_of_rows * seats_per_row
+
+    def reset(self):
+        for row in self.lobby_rows:
+            row.reset()
+        self.num_passengers = self.num_of_rows * self.seats_per_row
+
+    def truncate(self, counts):
+        """Keep only the first counts[i] passengers of each row"""
+        for row, count in zip(self.lobby_rows, counts):
+            del row.passengers[count:]
+        self.num_passengers = sum(len(row.passengers) for row in self.lobby_rows)
 
     def remove_passenger(self, row_num):
-        return self.lobby_rows[row_num].passengers.pop()
+        passenger = self.lobby_rows[row_num].passengers.pop()
+        self.num_passengers -= 1
+        return passenger
+
+    def add_passenger(self, passenger):
+        self.lobby_rows[passenger.row_num].passengers.append(passenger)
+        self.num_passengers += 1
 
     def count_passengers(self):
-        return sum(len(row.passengers) for row in self.lobby_rows)
+        return self.num_passengers
 
 class BoardingLine:
+    """Passengers in the aisle plus the queue waiting outside the door.
+
+    The aisle is a fixed list with one slot per row; slot 0 is the far end. The door queue is
+    a deque that feeds the last aisle slot. Queued passengers only ever move or wait
+    together, so their common status is kept in `queue_status` and copied onto the
+    passenger objects only when someone reads them (sync_queue_status). A tick therefore
+    costs O(num_of_rows) no matter how long the queue is.
+    """
+    __slots__ = ("num_of_rows", "aisle", "queue", "queue_status")
+
     def __init__(self, num_of_rows):
         self.num_of_rows = num_of_rows
-        self.line = [None for _ in range(num_of_rows)]
+        self.aisle = [None for _ in range(num_of_rows)]
+        self.queue = deque()
+        self.queue_status = PassengerStatus.MOVING
+
+    def reset(self):
+        for i in range(self.num_of_rows):
+            self.aisle[i] = None
+        self.queue.clear()
+        self.queue_status = PassengerStatus.MOVING
+
+    @property
+    def line(self):
+        """Aisle slots followed by the door queue, as one list"""
+        self.sync_queue_status()
+        return self.aisle + list(self.queue)
+
+    @line.setter
+    def line(self, line):
+        self.aisle[:] = line[:self.num_of_rows]
+        self.queue.clear()
+        self.queue.extend(p for p in line[self.num_of_rows:] if p is not None)
+        if self.queue:
+            self.queue_status = self.queue[0].status
+
+    def sync_queue_status(self):
+        for passenger in self.queue:
+            passenger.status = self.queue_status
 
     def add_passenger(self, passenger):
-        self.line.append(passenger)
+        self.queue.append(passenger)
 
     def is_onboarding(self):
-        return len(self.line) > 0 and not all(p is None for p in self.line)
+        return len(self.queue) > 0 or any(p is not None for p in self.aisle)
 
     def num_passengers_stalled(self):
-        return sum(1 for p in self.line if p and p.status == PassengerStatus.STALLED)
+        queued = len(self.queue) if self.queue_status == PassengerStatus.STALLED else 0
+        return queued + sum(1 for p in self.aisle if p and p.status == PassengerStatus.STALLED)
 
     def num_passengers_moving(self):
-        return sum(1 for p in self.line if p and p.status == PassengerStatus.MOVING)
+        queued = len(self.queue) if self.queue_status == PassengerStatus.MOVING else 0
+        return queued + sum(1 for p in self.aisle if p and p.status == PassengerStatus.MOVING)
 
     def move_forward(self):
-        for i, passenger in enumerate(self.line):
-            if passenger is None or i == 0 or passenger.status == PassengerStatus.STOWING:
+        aisle = self.aisle
+        for i in range(1, self.num_of_rows):
+            passenger = aisle[i]
+            if passenger is None or passenger.status == PassengerStatus.STOWING:
                 continue
-            if (passenger.status in [PassengerStatus.MOVING, PassengerStatus.STALLED]) and self.line[i-1] is None:
+            if passenger.walk_left > 1:
+                # Slow walkers spend walk_ticks in each slot before they can move on
+                passenger.walk_left -= 1
                 passenger.status = PassengerStatus.MOVING
-                self.line[i-1] = passenger
-                self.line[i] = None
+            elif aisle[i-1] is None:
+                passenger.walk_left = passenger.walk_ticks
+                passenger.status = PassengerStatus.MOVING
+                aisle[i-1] = passenger
+                aisle[i] = None
             else:
                 passenger.status = PassengerStatus.STALLED
 
-        for i in range(len(self.line)-1, self.num_of_rows-1, -1):
-            if self.line[i] is None:
-                self.line.pop(i)
+        # The whole queue steps forward when the last aisle slot is free, otherwise it waits
+        if self.queue:
+            if aisle[-1] is None:
+                passenger = self.queue.popleft()
+                passenger.status = PassengerStatus.MOVING
+                aisle[-1] = passenger
+                self.queue_status = PassengerStatus.MOVING
+            else:
+                self.queue_status = PassengerStatus.STALLED
 
 class Seat:
+    __slots__ = ("seat_num", "row_num", "passenger")
+
     def __init__(self, seat_num, row_num):
         self.seat_num = seat_num
         self.row_num = row_num
@@ -101,6 +199,9 @@ class Seat:
             passenger.status = PassengerStatus.STOWING
             passenger.is_holding_luggage = False
             return False
+        elif passenger.stow_left > 1:
+            passenger.stow_left -= 1
+            return False
         else:
             self.passenger = passenger
             self.passenger.status = PassengerStatus.SEATED
@@ -110,26 +211,78 @@ class Seat:
         return f"P{self.seat_num:02d}" if self.passenger else f"S{self.seat_num:02d}"
 
 class AirplaneRow:
+    __slots__ = ("row_num", "seats")
+
     def __init__(self, row_num, seats_per_row):
         self.row_num = row_num
         self.seats = [Seat(row_num * seats_per_row + i, row_num) for i in range(seats_per_row)]
 
+    def reset(self):
+        for seat in self.seats:
+            seat.passenger = None
+
     def try_sit_passenger(self, passenger):
-        found_seats = [s for s in self.seats if s.seat_num == passenger.seat_num]
-        if found_seats:
-            return found_seats[0].seat_passenger(passenger)
-        return False
+        if passenger.row_num != self.row_num:
+            return False
+        return self.seats[passenger.seat_num - self.seats[0].seat_num].seat_passenger(passenger)
+
+class TransitionCache:
+    """Bounded LRU map from (state, action) to the transition the simulator produced"""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        transition = self.entries.get(key)
+        if transition is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return transition
+
+    def put(self, key, transition):
+        self.entries[key] = transition
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries)}
 
 class AirplaneEnv(gym.Env):
     metadata = {'render_modes': ['human', 'terminal'], 'render_fps': 1}
 
-    def __init__(self, render_mode=None, num_of_rows=10, seats_per_row=5):
+    def __init__(self, render_mode=None, num_of_rows=10, seats_per_row=5, transition_cache_size=0, max_drain_ticks=None,
+                 render_every=1, ansi_redraw=False, stow_time=1, walk_time=1, tick_observer=None):
         self.seats_per_row = seats_per_row
         self.num_of_rows = num_of_rows
         self.num_of_seats = num_of_rows * seats_per_row
+        # Per-passenger stow and walk durations in ticks: a constant, or a distribution called as
+        # f(np_random, size) (see uniform_ticks, poisson_ticks). Distributions are sampled for all
+        # passengers at once in reset(), so ticks only count down and reset(seed=...) reproduces them.
+        self.stow_time = stow_time
+        self.walk_time = walk_time
+        self.stow_times = [1] * self.num_of_seats if callable(stow_time) else [stow_time] * self.num_of_seats
+        self.walk_times = [1] * self.num_of_seats if callable(walk_time) else [walk_time] * self.num_of_seats
+        # Once the lobby is empty the last step runs every remaining tick. With max_drain_ticks set,
+        # a step runs at most that many of them and the following steps (whatever their action)
+        # continue the drain, with info["drain_pending"] set until the cabin is done.
+        assert max_drain_ticks is None or max_drain_ticks >= 1
+        self.max_drain_ticks = max_drain_ticks
+        # Memoize transitions for small cabins, where the same states are revisited many times. Off by
+        # default: a miss costs about a step more, so it only pays off when most steps hit (benchmarks.py cache)
+        self.transition_cache = TransitionCache(transition_cache_size) if transition_cache_size > 0 else None
+
+        # Optional callable run with the env after every tick, e.g. congestion.CongestionHeatmap.observe.
+        # Cached transitions skip the ticks, so the cache is not used while an observer is set.
+        self.tick_observer = tick_observer
 
         self.render_mode = render_mode
         self.screen = self.clock = None
+        # Terminal mode: draw every render_every-th tick, optionally redrawing changed lines in place
+        self.terminal = TerminalRenderer(render_every, ansi_redraw)
         if self.render_mode == "human":
             pygame.init()
             pygame.display.set_caption("Airplane Boarding Simulation")
@@ -147,30 +300,191 @@ class AirplaneEnv(gym.Env):
                 PassengerStatus.STOWING: (250, 150, 50), "text": (0, 0, 0),
             }
 
+        # The cabin is built once; reset() puts the same objects back in place
+        self._airplane_rows = [AirplaneRow(row_num, self.seats_per_row) for row_num in range(self.num_of_rows)]
+        self.lobby = Lobby(self.num_of_rows, self.seats_per_row)
+        self._boarding_line = BoardingLine(self.num_of_rows)
+        # Cache hits are not applied to the line and seats until someone reads them (see _cached_step)
+        self._pending = None
+        self._line_key = None
+        self.passengers = [p for row in self.lobby.lobby_rows for p in row.all_passengers]
+
         self.action_space = spaces.Discrete(self.num_of_rows)
         self.observation_space = spaces.Box(low=-1, high=self.num_of_seats - 1, shape=(self.num_of_seats * 2,), dtype=np.int32)
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
-        self.airplane_rows = [AirplaneRow(row_num, self.seats_per_row) for row_num in range(self.num_of_rows)]
-        self.lobby = Lobby(self.num_of_rows, self.seats_per_row)
-        self.boarding_line = BoardingLine(self.num_of_rows)
+        if callable(self.stow_time):
+            self.stow_times = self._sample_durations(self.stow_time)
+        if callable(self.walk_time):
+            self.walk_times = self._sample_durations(self.walk_time)
+        self._reset_cabin()
+        self.boarding_time = 0
+        self.terminated = self.drain_pending = False
+        self.terminal.reset()
         self.render()
         return self._get_observation(), {}
 
+    def _sample_durations(self, distribution):
+        return np.maximum(np.asarray(distribution(self.np_random, self.num_of_seats)), 1).tolist()
+
+    @property
+    def boarding_line(self):
+        # Whoever reads the line may change it, so the cached key of the line is dropped too
+        self._materialize()
+        self._line_key = None
+        return self._boarding_line
+
+    @property
+    def airplane_rows(self):
+        self._materialize()
+        return self._airplane_rows
+
+    def _materialize(self):
+        """Apply the cache hits since the last read: restore the line they ended with and seat
+        everyone they seated"""
+        if self._pending is None:
+            return
+        line, seated = self._pending
+        self._pending = None
+        self._boarding_line.line = [None if slot is None else self._restore_passenger(*slot) for slot in line]
+        for seats in seated:
+            for seat_num in seats:
+                p = self.passengers[seat_num]
+                p.status = PassengerStatus.SEATED
+                p.is_holding_luggage = False
+                self._airplane_rows[p.row_num].seats[seat_num % self.seats_per_row].passenger = p
+
+    def _reset_cabin(self):
+        self._pending = None
+        self._line_key = None
+        for passenger, stow_ticks, walk_ticks in zip(self.passengers, self.stow_times, self.walk_times):
+            passenger.reset(stow_ticks, walk_ticks)
+        for row in self.airplane_rows:
+            row.reset()
+        self.lobby.reset()
+        self.boarding_line.reset()
+
     def _get_observation(self):
         observation = []
-        for passenger in self.boarding_line.line:
+        for passenger in self.boarding_line.aisle:
             if passenger is None:
                 observation += [-1, -1]
             else:
                 observation += [passenger.seat_num, passenger.status.value]
+        queue_status = self.boarding_line.queue_status.value
+        for passenger in self.boarding_line.queue:
+            observation += [passenger.seat_num, queue_status]
         while len(observation) < self.num_of_seats * 2:
             observation += [-1, -1]
         return np.array(observation, dtype=np.int32)
 
+    def get_state(self):
+        """Hashable snapshot: (seat, status, luggage, stow_left, walk_ticks, walk_left) per line slot and
+        passengers left in each lobby row. Durations of passengers still in the lobby are not part
+        of it; they come from the current episode's samples."""
+        return self._line_state(), tuple(len(row.passengers) for row in self.lobby.lobby_rows)
+
+    def _line_state(self):
+        return tuple(None if p is None else
+                     (p.seat_num, p.status.value, p.is_holding_luggage, p.stow_left, p.walk_ticks, p.walk_left)
+                     for p in self.boarding_line.line)
+
+    def set_state(self, state):
+        """Restore the cabin from a get_state() snapshot. Everyone not in the lobby or the line is seated."""
+        line, lobby_counts = state
+        self._reset_cabin()
+
+        self.lobby.truncate(lobby_counts)
+        self.boarding_line.line = [None if slot is None else self._restore_passenger(*slot) for slot in line]
+
+        in_line = {slot[0] for slot in line if slot is not None}
+        for row, count in zip(self.airplane_rows, lobby_counts):
+            for seat in row.seats[count:]:
+                if seat.seat_num not in in_line:
+                    seat.passenger = self._restore_passenger(seat.seat_num, PassengerStatus.SEATED.value)
+        self._update_episode_status()
+
+    def _restore_passenger(self, seat_num, status, is_holding_luggage=False, stow_left=1, walk_ticks=1, walk_left=1):
+        passenger = self.passengers[seat_num]
+        passenger.status = PassengerStatus(status)
+        passenger.is_holding_luggage = is_holding_luggage
+        passenger.stow_left = stow_left
+        passenger.walk_ticks = walk_ticks
+        passenger.walk_left = walk_left
+        return passenger
+
     def step(self, row_num):
+        reward, terminated = self.step_fast(row_num)
+        info = {"boarding_time": self.boarding_time}
+        if self.drain_pending:
+            info["drain_pending"] = True
+        return self._get_observation(), reward, terminated, False, info
+
+    def step_fast(self, row_num):
+        """Same transition as step() without building the observation. Returns (reward, terminated).
+
+        For scripted strategies that never look at the observation. The result is also left in
+        self.terminated and self.boarding_time, and action_masks() stays valid.
+        """
         assert 0 <= row_num < self.num_of_rows
+        if self.drain_pending:
+            reward = self._drain()
+        elif self.transition_cache is not None and self.render_mode is None and self.tick_observer is None:
+            return self._cached_step(row_num), self.terminated
+        else:
+            reward = self._step(row_num)
+        self._update_episode_status()
+        return reward, self.terminated
+
+    def _update_episode_status(self):
+        self.terminated = not self.is_onboarding()
+        self.drain_pending = not self.terminated and self.lobby.count_passengers() == 0
+
+    def _cached_step(self, row_num):
+        """step_fast through the transition cache.
+
+        The key is the line state (_line_state) plus the boarding passenger and whether the lobby
+        is empty afterwards; the lobby counts do not change what happens in the aisle. The line
+        state a transition ends in is kept as the key of the next step, so a run of hits neither
+        walks the line nor touches passenger objects: it only pops the lobby and queues the line
+        to restore and the seats to fill for _materialize().
+        """
+        lobby = self.lobby
+        passenger = lobby.lobby_rows[row_num].passengers[-1]
+        line_key = self._line_key
+        if line_key is None:
+            line_key = self._line_state()
+        last = lobby.num_passengers == 1
+        key = (line_key, passenger.seat_num, passenger.stow_left, passenger.walk_ticks, last)
+        transition = self.transition_cache.get(key)
+
+        if transition is None:
+            on_board = {slot[0] for slot in line_key if slot is not None}
+            on_board.add(passenger.seat_num)
+            ticks_before = self.boarding_time
+            reward = self._step(row_num)
+            self._update_episode_status()
+            line = self._line_state()
+            seated = tuple(on_board - {slot[0] for slot in line if slot is not None})
+            self.transition_cache.put(key, (line, seated, reward, self.boarding_time - ticks_before, self.terminated))
+            self._line_key = line
+            return reward
+
+        # Replay the stored transition instead of simulating the ticks
+        line, seated, reward, ticks, terminated = transition
+        lobby.remove_passenger(row_num)
+        if self._pending is None:
+            self._pending = [line, []]
+        self._pending[0] = line
+        self._pending[1].append(seated)
+        self._line_key = line
+        self.boarding_time += ticks
+        self.terminated = terminated
+        self.drain_pending = not terminated and last
+        return reward
+
+    def _step(self, row_num):
         reward = 0
         passenger = self.lobby.remove_passenger(row_num)
         self.boarding_line.add_passenger(passenger)
@@ -179,24 +493,36 @@ class AirplaneEnv(gym.Env):
             self._move()
             reward = self._calculate_reward()
         else:
-            while self.is_onboarding():
-                self._move()
-                reward += self._calculate_reward()
+            reward = self._drain()
+        return reward
 
-        return self._get_observation(), reward, not self.is_onboarding(), False, {}
+    def _drain(self):
+        """Run the ticks left after the lobby is empty, at most max_drain_ticks of them"""
+        reward = ticks = 0
+        while self.is_onboarding() and ticks != self.max_drain_ticks:
+            self._move()
+            reward += self._calculate_reward()
+            ticks += 1
+        return reward
 
     def _calculate_reward(self):
-        return -self.boarding_line.num_passengers_stalled() + self.boarding_line.num_passengers_moving()
+        line = self.boarding_line
+        return -line.num_passengers_stalled() + line.num_passengers_moving()
 
     def is_onboarding(self):
         return self.lobby.count_passengers() > 0 or self.boarding_line.is_onboarding()
 
     def _move(self):
-        for i, passenger in enumerate(self.boarding_line.line):
-            if passenger and i < self.num_of_rows:
-                if self.airplane_rows[i].try_sit_passenger(passenger):
-                    self.boarding_line.line[i] = None
-        self.boarding_line.move_forward()
+        line = self.boarding_line
+        aisle = line.aisle
+        rows = self._airplane_rows
+        for i, passenger in enumerate(aisle):
+            if passenger and rows[i].try_sit_passenger(passenger):
+                aisle[i] = None
+        line.move_forward()
+        self.boarding_time += 1
+        if self.tick_observer is not None:
+            self.tick_observer(self)
         self.render()
 
     def render(self):
@@ -212,23 +538,24 @@ class AirplaneEnv(gym.Env):
             self.screen = None
 
     def action_masks(self):
+        if self.drain_pending:
+            # The action is ignored while draining, but a fully masked step would break MaskablePPO
+            return [True] * self.num_of_rows
         return [bool(row.passengers) for row in self.lobby.lobby_rows]
 
     def _render_terminal(self):
-        print("Seats".center(19) + " | Aisle Line")
-        for row in self.airplane_rows:
-            print(" ".join(str(seat) for seat in row.seats), end=" ")
-            if row.row_num < len(self.boarding_line.line):
-                passenger = self.boarding_line.line[row.row_num]
-                print(f"| {passenger} {passenger.status}" if passenger else "", end="")
-            print()
-        print("\nLine entering plane:")
-        for passenger in self.boarding_line.line[self.num_of_rows:]:
-            if passenger:
-                print(f"{passenger} {passenger.status}")
-        print("\nLobby:")
-        for row in self.lobby.lobby_rows:
-            print(" ".join(str(p) for p in row.passengers))
+        if not self.terminal.tick(force=not self.is_onboarding()):
+            return
+        lines = ["Seats".center(19) + " | Aisle Line"]
+        for row, passenger in zip(self.airplane_rows, self.boarding_line.aisle):
+            seats = " ".join(str(seat) for seat in row.seats)
+            lines.append(f"{seats} | {passenger} {passenger.status}" if passenger else f"{seats} ")
+        lines += ["", "Line entering plane:"]
+        queue_status = self.boarding_line.queue_status
+        lines += [f"{passenger} {queue_status}" for passenger in self.boarding_line.queue]
+        lines += ["", "Lobby:"]
+        lines += [" ".join(str(p) for p in row.passengers) for row in self.lobby.lobby_rows]
+        self.terminal.draw(lines)
 
     def _render_human(self):
         for event in pygame.event.get():
@@ -251,7 +578,7 @@ class AirplaneEnv(gym.Env):
                 text = self.font.render(str(seat), True, self.COLORS["text"])
                 self.screen.blit(text, text.get_rect(center=(x + self.SEAT_SIZE / 2, y + self.SEAT_SIZE / 2)))
 
-        for i, passenger in enumerate(self.boarding_line.line[:self.num_of_rows]):
+        for i, passenger in enumerate(self.boarding_line.aisle):
             if passenger:
                 px = aisle_x + self.AISLE_WIDTH / 2
                 py = i * (self.SEAT_SIZE + self.PADDING) + self.SEAT_SIZE / 2
@@ -0,0 +1,149 @@
+import multiprocessing as mp
+import os
+import queue
+
+import numpy as np
+from stable_baselines3.common.callbacks import EventCallback
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from airplane_boarding import AirplaneEnv
+
+
+def _eval_worker(tasks, results, env_kwargs, policy_kwargs, n_eval_envs, n_eval_episodes, deterministic,
+                 best_model_save_path):
+    """Evaluate policy snapshots sent by the training process on a private env pool"""
+    import torch
+    from sb3_contrib import MaskablePPO
+    from sb3_contrib.common.maskable.evaluation import evaluate_policy
+
+    # Leave the cores to the rollout workers
+    torch.set_num_threads(1)
+    eval_env = make_vec_env(AirplaneEnv, n_envs=n_eval_envs, env_kwargs=env_kwargs, vec_env_cls=DummyVecEnv)
+    model = MaskablePPO("MlpPolicy", eval_env, policy_kwargs=policy_kwargs, device="cpu")
+    best_mean_reward = -np.inf
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        num_timesteps, state_dict = task
+        model.policy.load_state_dict(state_dict)
+        episode_rewards, _ = evaluate_policy(model, eval_env, n_eval_episodes=n_eval_episodes,
+                                             deterministic=deterministic, return_episode_rewards=True)
+        mean_reward, std_reward = float(np.mean(episode_rewards)), float(np.std(episode_rewards))
+
+        new_best = mean_reward > best_mean_reward
+        if new_best:
+            best_mean_reward = mean_reward
+            if best_model_save_path is not None:
+                model.save(os.path.join(best_model_save_path, "best_model"))
+        results.put((num_timesteps, mean_reward, std_reward, new_best))
+
+    eval_env.close()
+
+
+class AsyncMaskableEvalCallback(EventCallback):
+    """Out-of-process replacement for MaskableEvalCallback.
+
+    Every `eval_freq` calls the current policy weights are copied to a background process,
+    which evaluates them on its own envs while rollouts continue. Results are picked up on
+    later steps and drive best-model saving, `callback_on_new_best` and `callback_after_eval`
+    exactly like the synchronous callback (the stop-training callbacks read
+    `parent.best_mean_reward`). At most `max_pending` snapshots are in flight; further
+    snapshots are skipped until the worker catches up.
+    """
+
+    def __init__(self, env_kwargs, callback_on_new_best=None, callback_after_eval=None, n_eval_episodes=5,
+                 eval_freq=10_000, n_eval_envs=1, best_model_save_path=None, deterministic=True, max_pending=1,
+                 verbose=1):
+        super().__init__(callback_after_eval, verbose=verbose)
+        self.callback_on_new_best = callback_on_new_best
+        if self.callback_on_new_best is not None:
+            self.callback_on_new_best.parent = self
+
+        self.env_kwargs = env_kwargs
+        self.n_eval_episodes = n_eval_episodes
+        self.eval_freq = eval_freq
+        self.n_eval_envs = n_eval_envs
+        self.best_model_save_path = best_model_save_path
+        self.deterministic = deterministic
+        self.max_pending = max_pending
+
+        self.best_mean_reward = -np.inf
+        self.last_mean_reward = -np.inf
+        self.evaluations_timesteps = []
+        self.evaluations_results = []
+        self._pending = 0
+        self._process = None
+
+    def _init_callback(self):
+        if self.best_model_save_path is not None:
+            os.makedirs(self.best_model_save_path, exist_ok=True)
+        if self.callback_on_new_best is not None:
+            self.callback_on_new_best.init_callback(self.model)
+
+        ctx = mp.get_context("spawn")
+        self._tasks, self._results = ctx.Queue(), ctx.Queue()
+        self._process = ctx.Process(
+            target=_eval_worker,
+            args=(self._tasks, self._results, self.env_kwargs, self.model.policy_kwargs, self.n_eval_envs,
+                  self.n_eval_episodes, self.deterministic, self.best_model_save_path),
+            daemon=True,
+        )
+        self._process.start()
+
+    def _snapshot(self):
+        state_dict = {k: v.detach().cpu().clone() for k, v in self.model.policy.state_dict().items()}
+        self._tasks.put((self.num_timesteps, state_dict))
+        self._pending += 1
+
+    def _handle_result(self, result):
+        num_timesteps, mean_reward, std_reward, new_best = result
+        self._pending -= 1
+        self.last_mean_reward = mean_reward
+        self.evaluations_timesteps.append(num_timesteps)
+        self.evaluations_results.append(mean_reward)
+        if self.verbose >= 1:
+            print(f"Eval num_timesteps={num_timesteps}, episode_reward={mean_reward:.2f} +/- {std_reward:.2f}")
+        self.logger.record("eval/mean_reward", mean_reward)
+        self.logger.record("eval/snapshot_timesteps", num_timesteps)
+
+        continue_training = True
+        if new_best:
+            if self.verbose >= 1:
+                print("New best mean reward!")
+            self.best_mean_reward = mean_reward
+            if self.callback_on_new_best is not None:
+                continue_training = self.callback_on_new_best.on_step()
+        if self.callback is not None:
+            continue_training = continue_training and self._on_event()
+        return continue_training
+
+    def _on_step(self):
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            if self._pending < self.max_pending:
+                self._snapshot()
+            elif self.verbose >= 2:
+                print(f"Skipping eval at num_timesteps={self.num_timesteps}, previous snapshot still running")
+
+        continue_training = True
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            continue_training = self._handle_result(result) and continue_training
+        return continue_training
+
+    def _on_training_end(self):
+        # Collect evaluations still in flight so the final best model gets saved
+        while self._pending > 0 and self._process.is_alive():
+            try:
+                self._handle_result(self._results.get(timeout=1))
+            except queue.Empty:
+                continue
+        self._tasks.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
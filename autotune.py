@@ -0,0 +1,140 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import time
+
+train_config_path = os.path.join("models", "train_config.json")
+
+# Keys of the config file that are passed through to MaskablePPO
+ppo_keys = ("n_steps", "batch_size")
+
+
+def load_train_config(path=train_config_path):
+    """The configuration written by calibrate(), or None if this host was never calibrated"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _thread_counts(cpus):
+    return sorted({1, max(cpus // 2, 1), cpus})
+
+
+def _env_counts(cpus):
+    return sorted({1, 2, 4, cpus, 2 * cpus} - {0})
+
+
+def measure(n_envs, vec_env, torch_threads, n_steps, batch_size, num_of_rows=10, seats_per_row=5, iterations=3):
+    """Time PPO iterations for one setting: environment steps per second while collecting
+    rollouts, while updating, and overall. The first iteration is a warm-up and not counted."""
+    import torch
+    from sb3_contrib import MaskablePPO
+    from stable_baselines3.common.callbacks import BaseCallback
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+    from airplane_boarding import AirplaneEnv
+
+    class Timer(BaseCallback):
+        def __init__(self):
+            super().__init__()
+            self.marks = []
+
+        def _on_rollout_start(self):
+            self.marks.append(("start", time.perf_counter()))
+
+        def _on_rollout_end(self):
+            self.marks.append(("end", time.perf_counter()))
+
+        def _on_step(self):
+            return True
+
+    torch.set_num_threads(torch_threads)
+    vec_env_cls = SubprocVecEnv if vec_env == "subproc" else DummyVecEnv
+    env = make_vec_env(AirplaneEnv, n_envs=n_envs, vec_env_cls=vec_env_cls,
+                       env_kwargs={"num_of_rows": num_of_rows, "seats_per_row": seats_per_row})
+    model = MaskablePPO("MlpPolicy", env, device="cpu", n_steps=n_steps, batch_size=batch_size, seed=0)
+    timer = Timer()
+    model.learn(total_timesteps=iterations * n_steps * n_envs, callback=timer)
+    timer.marks.append(("start", time.perf_counter()))
+    env.close()
+
+    # marks alternate start/end per iteration; an update runs from an end to the next start
+    times = [t for _, t in timer.marks]
+    rollout = sum(times[i + 1] - times[i] for i in range(2, len(times) - 1, 2))
+    update = sum(times[i + 1] - times[i] for i in range(3, len(times) - 1, 2))
+    steps = (iterations - 1) * n_steps * n_envs
+    return {
+        "rollout_steps_per_s": steps / rollout,
+        "update_steps_per_s": steps / update,
+        "steps_per_s": steps / (rollout + update),
+    }
+
+
+def calibrate(num_of_rows=10, seats_per_row=5, cpus=None, n_steps_options=(128, 256, 512, 1024),
+              batch_size_options=(64, 128, 256), verbose=True):
+    """Find the fastest training setting on this host, in two stages to keep calibration short.
+
+    First the env count and vec env class are chosen on rollout throughput alone, then torch
+    threads, n_steps and batch_size on the throughput of whole iterations. This only tunes
+    speed: n_steps and batch_size also change what PPO learns, so the options stay in a range
+    that trains well on this environment.
+    """
+    cpus = cpus or os.cpu_count()
+    results = []
+
+    def run(**setting):
+        result = {**setting, **measure(num_of_rows=num_of_rows, seats_per_row=seats_per_row, **setting)}
+        results.append(result)
+        if verbose:
+            print(", ".join(f"{key}={value:,.0f}" if isinstance(value, float) else f"{key}={value}"
+                            for key, value in result.items()))
+        return result
+
+    rollouts = [run(n_envs=n_envs, vec_env=vec_env, torch_threads=1, n_steps=256, batch_size=64)
+                for n_envs, vec_env in itertools.product(_env_counts(cpus), ("dummy", "subproc"))
+                if not (vec_env == "subproc" and n_envs == 1)]
+    best_envs = max(rollouts, key=lambda result: result["rollout_steps_per_s"])
+
+    for threads, n_steps, batch_size in itertools.product(_thread_counts(cpus), n_steps_options, batch_size_options):
+        # Minibatches must split the rollout buffer evenly
+        if (n_steps * best_envs["n_envs"]) % batch_size == 0:
+            run(n_envs=best_envs["n_envs"], vec_env=best_envs["vec_env"], torch_threads=threads,
+                n_steps=n_steps, batch_size=batch_size)
+    best = max(results, key=lambda result: result["steps_per_s"])
+    return best, results
+
+
+def save_train_config(best, path=train_config_path, **meta):
+    config = {
+        "device": "cpu",
+        "n_envs": best["n_envs"],
+        "vec_env": best["vec_env"],
+        "torch_threads": best["torch_threads"],
+        "n_steps": best["n_steps"],
+        "batch_size": best["batch_size"],
+        "steps_per_s": round(best["steps_per_s"]),
+        "host": {"node": platform.node(), "cpus": os.cpu_count()},
+        **meta,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate training parallelism on this host")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--cpus", type=int, help="CPUs to plan for (default: all)")
+    parser.add_argument("--out", default=train_config_path)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    best, results = calibrate(args.rows, args.seats, cpus=args.cpus)
+    config = save_train_config(best, args.out, cabin=[args.rows, args.seats])
+    print(f"Tried {len(results)} settings in {time.perf_counter() - start:.0f}s")
+    print(f"Best: {config} -> {args.out}")
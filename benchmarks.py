@@ -0,0 +1,219 @@
+import argparse
+import contextlib
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+
+
+def _back_to_front_actions(env):
+    return [row for row in reversed(range(env.num_of_rows)) for _ in range(env.seats_per_row)]
+
+
+def bench_reset(num_of_rows=10, seats_per_row=5, episodes=2000):
+    """Reset latency, bytes allocated per reset and GC runs per 1000 short episodes"""
+    env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    env.reset()
+    actions = _back_to_front_actions(env)
+
+    start = time.perf_counter()
+    for _ in range(episodes):
+        env.reset()
+    reset_latency = (time.perf_counter() - start) / episodes
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(100):
+        for row_num in actions:
+            env.step(row_num)
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        env.reset()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    collections = [0]
+    def count_collections(phase, info):
+        if phase == "start":
+            collections[0] += 1
+    gc.callbacks.append(count_collections)
+    try:
+        for _ in range(episodes):
+            env.reset()
+            for row_num in actions:
+                env.step(row_num)
+    finally:
+        gc.callbacks.remove(count_collections)
+
+    return {
+        "reset_us": reset_latency * 1e6,
+        "bytes_per_reset": float(np.median(peaks)),
+        "gc_runs_per_1000_episodes": collections[0] * 1000 / episodes,
+    }
+
+
+def bench_tick(num_of_rows=10, seats_per_row=5, episodes=200):
+    """Mean simulation cost of a decision step (no observation) and the longest door queue seen"""
+    env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    result = {}
+    for name, actions in (("front_to_back", _back_to_front_actions(env)[::-1]),
+                          ("back_to_front", _back_to_front_actions(env))):
+        # The last action drains the cabin, so only time the decisions before it
+        elapsed = max_queue = 0
+        for _ in range(episodes):
+            env.reset()
+            start = time.perf_counter()
+            for row_num in actions[:-1]:
+                env._step(row_num)
+            elapsed += time.perf_counter() - start
+            max_queue = max(max_queue, len(env.boarding_line.line) - num_of_rows)
+            env.step(actions[-1])
+        result[f"{name}_step_us"] = elapsed / (episodes * (len(actions) - 1)) * 1e6
+        result[f"{name}_queue"] = max_queue
+    return result
+
+
+def bench_drain(num_of_rows=10, seats_per_row=5, episodes=200, max_drain_ticks=4):
+    """Step latency percentiles back-to-front, with the usual one-shot drain and with a drain tick budget"""
+    result = {}
+    for name, budget in (("standard", None), ("bounded", max_drain_ticks)):
+        env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row, max_drain_ticks=budget)
+        actions = _back_to_front_actions(env)
+        latencies = []
+        for _ in range(episodes):
+            env.reset()
+            for row_num in actions:
+                start = time.perf_counter()
+                env.step_fast(row_num)
+                latencies.append(time.perf_counter() - start)
+            while not env.terminated:
+                start = time.perf_counter()
+                env.step_fast(0)
+                latencies.append(time.perf_counter() - start)
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) * 1e6
+        result.update({f"{name}_p50_us": p50, f"{name}_p99_us": p99, f"{name}_p99.9_us": p999})
+    return result
+
+
+class _CountingStream:
+    """stdout stand-in that counts write calls and characters"""
+
+    def __init__(self):
+        self.writes = self.chars = 0
+
+    def write(self, text):
+        self.writes += 1
+        self.chars += len(text)
+
+    def flush(self):
+        pass
+
+
+def bench_render(num_of_rows=10, seats_per_row=5, episodes=20):
+    """Terminal-mode cost per tick (time, write calls, characters) for a few renderer settings"""
+    result = {}
+    for name, kwargs in (("every_tick", {}), ("ansi_redraw", {"ansi_redraw": True}),
+                         ("every_10_ticks", {"render_every": 10})):
+        env = AirplaneEnv(render_mode="terminal", num_of_rows=num_of_rows, seats_per_row=seats_per_row, **kwargs)
+        actions = _back_to_front_actions(env)
+        stream = _CountingStream()
+        ticks = 0
+        with contextlib.redirect_stdout(stream):
+            start = time.perf_counter()
+            for _ in range(episodes):
+                env.reset()
+                for row_num in actions:
+                    env.step_fast(row_num)
+                ticks += env.boarding_time
+            elapsed = time.perf_counter() - start
+        result.update({f"{name}_tick_us": elapsed / ticks * 1e6, f"{name}_writes_per_tick": stream.writes / ticks,
+                       f"{name}_chars_per_tick": stream.chars / ticks})
+    return result
+
+
+def bench_strategies(num_of_rows=10, seats_per_row=5, episodes=500):
+    """Episodes per second of the scripted baselines in boarding_strategies.py"""
+    from boarding_strategies import make_env, random_strategy, back_to_front, front_to_back, wilma
+
+    env = make_env(rows=num_of_rows, seats=seats_per_row)
+    result = {}
+    for name, strategy in (("random", random_strategy), ("back_to_front", back_to_front),
+                           ("front_to_back", front_to_back), ("wilma", wilma)):
+        start = time.perf_counter()
+        for _ in range(episodes):
+            strategy(env)
+        result[f"{name}_episodes_per_s"] = episodes / (time.perf_counter() - start)
+    env.close()
+    return result
+
+
+def bench_make_env(num_of_rows=10, seats_per_row=5, episodes=500):
+    """Cost of one back-to-front run including getting the env: gym.make, direct construction
+    and a warm env from the pool"""
+    from boarding_strategies import EnvPool, back_to_front, make_env
+
+    pool = EnvPool()
+    getters = {
+        "gym_make": lambda: make_env(num_of_rows, seats_per_row, checked=True),
+        "direct": lambda: make_env(num_of_rows, seats_per_row),
+    }
+    result = {}
+    for name, get_env in getters.items():
+        start = time.perf_counter()
+        for _ in range(episodes):
+            env = get_env()
+            back_to_front(env)
+            env.close()
+        result[f"{name}_run_us"] = (time.perf_counter() - start) / episodes * 1e6
+    start = time.perf_counter()
+    for _ in range(episodes):
+        with pool.lease(num_of_rows, seats_per_row) as env:
+            back_to_front(env)
+    result["pooled_run_us"] = (time.perf_counter() - start) / episodes * 1e6
+    return result
+
+
+def bench_transition_cache(num_of_rows=10, seats_per_row=5, episodes=500, cache_size=1 << 16):
+    """Episodes per second of the scripted strategies with the transition cache off and on, and
+    the cache hit rate. Random orders rarely repeat a state, so they mostly pay for misses."""
+    from boarding_strategies import make_env, random_strategy, back_to_front, wilma
+
+    result = {}
+    for name, strategy in (("back_to_front", back_to_front), ("wilma", wilma), ("random", random_strategy)):
+        for label, size in (("off", 0), ("on", cache_size)):
+            env = make_env(num_of_rows, seats_per_row, transition_cache_size=size)
+            np.random.seed(0)
+            strategy(env)  # warms the cache
+            start = time.perf_counter()
+            for _ in range(episodes):
+                strategy(env)
+            result[f"{name}_{label}_episodes_per_s"] = episodes / (time.perf_counter() - start)
+        stats = env.transition_cache.stats()
+        result[f"{name}_hit_rate"] = stats["hits"] / max(stats["hits"] + stats["misses"], 1)
+    return result
+
+
+benchmarks = {
+    "cache": bench_transition_cache,
+    "drain": bench_drain,
+    "make_env": bench_make_env,
+    "render": bench_render,
+    "reset": bench_reset,
+    "strategies": bench_strategies,
+    "tick": bench_tick,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the boarding simulator")
+    parser.add_argument("benchmark", nargs="?", choices=sorted(benchmarks), default=None, help="Default: all")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    args = parser.parse_args()
+
+    for name in [args.benchmark] if args.benchmark else sorted(benchmarks):
+        result = benchmarks[name](num_of_rows=args.rows, seats_per_row=args.seats)
+        print(f"{name}: " + ", ".join(f"{key}={value:,.2f}" for key, value in result.items()))
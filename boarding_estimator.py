@@ -0,0 +1,146 @@
+import argparse
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+
+def estimate_boarding(order, num_of_rows, stow_times=None, walk_times=None):
+    """Boarding time and total reward of a row order, without running the tick simulation.
+
+    `order` is the sequence of rows passed to AirplaneEnv.step. The aisle is a chain of
+    single-passenger slots (slot i is row i, slots >= num_of_rows are the queue outside the
+    door) that nobody overtakes, so each passenger's timing follows from its predecessors:
+
+    * passenger k is appended at tick k, one slot behind the last passenger still in line;
+    * it can enter slot s-1 one tick after reaching slot s (walk_times[k] ticks inside the
+      aisle), and no earlier than the tick in which the previous passenger through slot s-1 left it;
+    * at its row it stows for stow_times[k] ticks and is seated (freeing the slot) on the next.
+
+    stow_times and walk_times are per position in `order` and default to AirplaneEnv's one
+    tick. The answer is exact for AirplaneEnv's rules. Cost is one pass over each passenger's
+    path plus a binary search for the tail of the line.
+    Returns (boarding_time, total_reward).
+    """
+    last_dep = {}      # slot -> tick the latest passenger through it left
+    paths = []         # per passenger: (entry slot, arrival ticks from the entry slot forward)
+    seated_at = []
+    in_line = []       # candidates for the tail of the line, latest last
+    boarding_time = total_reward = 0
+
+    for k, row in enumerate(order):
+        while in_line and seated_at[in_line[-1]] <= k:
+            in_line.pop()
+        entry = num_of_rows
+        if in_line:
+            tail_entry, tail_arrivals = paths[in_line[-1]]
+            entry = max(num_of_rows, tail_entry - (bisect_right(tail_arrivals, k) - 1) + 1)
+
+        stow = 1 if stow_times is None else stow_times[k]
+        walk = 1 if walk_times is None else walk_times[k]
+        arrivals = [k]
+        tick = k
+        for slot in range(entry, row, -1):
+            tick = max(tick + (walk if slot < num_of_rows else 1), last_dep.get(slot - 1, 0))
+            last_dep[slot] = tick
+            arrivals.append(tick)
+        last_dep[row] = tick + 1 + stow
+
+        paths.append((entry, arrivals))
+        seated_at.append(tick + 1 + stow)
+        in_line.append(k)
+        boarding_time = max(boarding_time, tick + 1 + stow)
+        # Each move, and each tick of walking inside a slot, earns +1; every other tick before
+        # reaching the row is spent stalled and costs -1
+        moves = entry - row
+        walking = moves + (walk - 1) * (num_of_rows - 1 - row)
+        total_reward += walking - (tick - k - walking)
+
+    return boarding_time, total_reward
+
+
+def estimate_boarding_batch(orders, num_of_rows, chunk_size=8192):
+    """Vectorized estimate_boarding over a (num_orders, num_passengers) array of row orders.
+
+    Orders advance passenger by passenger in lockstep, walking the slots from the back of the
+    queue to the front with NumPy masks. Per-slot state is stored slot-major so every update
+    touches one contiguous row. Returns arrays (boarding_times, total_rewards).
+    """
+    orders = np.asarray(orders)
+    boarding_times, total_rewards = [], []
+    for begin in range(0, len(orders), chunk_size):
+        times, rewards = _estimate_chunk(orders[begin:begin + chunk_size], num_of_rows)
+        boarding_times.append(times)
+        total_rewards.append(rewards)
+    return np.concatenate(boarding_times), np.concatenate(total_rewards)
+
+
+def _estimate_chunk(orders, num_of_rows):
+    orders = orders.T.astype(np.int32)
+    num_passengers, num_orders = orders.shape
+    num_slots = num_of_rows + num_passengers + 1
+    latest_arr = np.zeros((num_slots, num_orders), dtype=np.int32)
+    last_dep = np.zeros((num_slots, num_orders), dtype=np.int32)
+    boarding_times = np.zeros(num_orders, dtype=np.int32)
+    total_rewards = np.zeros(num_orders, dtype=np.int32)
+    slots = np.arange(num_slots, dtype=np.int32)[:, None]
+    everyone = np.arange(num_orders)
+
+    for k in range(num_passengers):
+        rows = orders[k]
+        # The tail of the line is the furthest slot whose latest passenger is still in it
+        occupied = (latest_arr <= k) & (last_dep > k)
+        entry = np.maximum(num_of_rows, np.where(occupied, slots, -1).max(axis=0) + 1)
+
+        tick = np.full(num_orders, k, dtype=np.int32)
+        latest_arr[entry, everyone] = k
+        for slot in range(int(entry.max()), int(rows.min()), -1):
+            walking = (slot <= entry) & (slot > rows)
+            tick = np.where(walking, np.maximum(tick + 1, last_dep[slot - 1]), tick)
+            np.copyto(last_dep[slot], tick, where=walking)
+            np.copyto(latest_arr[slot - 1], tick, where=walking)
+        last_dep[rows, everyone] = tick + 2
+
+        np.maximum(boarding_times, tick + 2, out=boarding_times)
+        moves = entry - rows
+        total_rewards += moves - (tick - k - moves)
+
+    return boarding_times, total_rewards
+
+
+def simulate_boarding(order, num_of_rows, seats_per_row):
+    """Reference result from AirplaneEnv, for checking the estimator"""
+    from airplane_boarding import AirplaneEnv
+
+    env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    env.reset()
+    total_reward = 0
+    for row_num in order:
+        reward, _ = env.step_fast(row_num)
+        total_reward += reward
+    return env.boarding_time, total_reward
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the analytical boarding estimator")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--check", type=int, default=200, help="Orders to compare against the simulator")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = np.repeat(np.arange(args.rows), args.seats)
+    orders = np.array([rng.permutation(base) for _ in range(args.orders)])
+
+    mismatches = 0
+    for order in orders[:args.check]:
+        expected = simulate_boarding(order.tolist(), args.rows, args.seats)
+        mismatches += estimate_boarding(order.tolist(), args.rows) != expected
+    print(f"{mismatches} mismatches against AirplaneEnv in {min(args.check, args.orders)} orders")
+
+    start = time.perf_counter()
+    times, rewards = estimate_boarding_batch(orders, args.rows)
+    elapsed = time.perf_counter() - start
+    print(f"Estimated {args.orders} orders in {elapsed:.2f}s ({args.orders / elapsed * 60:,.0f} orders/min), "
+          f"best time {times.min()}, mean {times.mean():.2f}")
@@ -1,40 +1,108 @@
+from contextlib import contextmanager
+
 import numpy as np
 import gymnasium as gym
-from gymnasium.envs.registration import register
-
-try:
-    register(
-        id="airplane-boarding-v0",
-        entry_point="airplane_boarding:AirplaneEnv",  # ✅ Correct class name
-    )
-except Exception:
-    pass
-
-
 
-def make_env(rows=10, seats=5, render_mode=None):
-    """Return a new airplane env instance."""
-    return gym.make(
-        "airplane-boarding-v0",
-        num_of_rows=rows,
-        seats_per_row=seats,
-        render_mode=render_mode
-    )
 
+def make_env(rows=10, seats=5, render_mode=None, checked=False, **env_kwargs):
+    """Return a new airplane env instance.
+
+    The env is built directly, without the passive env checker and order-enforcing wrappers
+    that gym.make adds on every call. Pass checked=True to go through gym.make and get those
+    checks, e.g. when validating the env; the strategies then step through the wrappers too,
+    instead of calling step_fast on env.unwrapped.
+    """
+    # Imported here because airplane_boarding imports this module
+    from airplane_boarding import AirplaneEnv
+
+    if checked:
+        return gym.make("airplane-boarding-v0", num_of_rows=rows, seats_per_row=seats, render_mode=render_mode,
+                        **env_kwargs)
+    return AirplaneEnv(render_mode=render_mode, num_of_rows=rows, seats_per_row=seats, **env_kwargs)
+
+
+class EnvPool:
+    """Warm envs for loops that would otherwise build one per run, keyed by cabin configuration.
+
+    acquire() hands out an idle env with the same configuration if there is one and builds a
+    new one otherwise; release() gives it back, exactly once. Strategies reset the env
+    themselves, so pooled envs are returned as they are. At most max_idle envs are kept per
+    configuration.
+    """
+
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self.idle = {}
+        self.keys = {}
+
+    @staticmethod
+    def _key(rows, seats, render_mode, env_kwargs):
+        return rows, seats, render_mode, tuple(sorted(env_kwargs.items()))
+
+    def acquire(self, rows=10, seats=5, render_mode=None, **env_kwargs):
+        key = self._key(rows, seats, render_mode, env_kwargs)
+        idle = self.idle.get(key)
+        env = idle.pop() if idle else make_env(rows, seats, render_mode, **env_kwargs)
+        self.keys[id(env)] = key
+        return env
+
+    def release(self, env):
+        key = self.keys.pop(id(env), None)
+        if key is None:
+            raise ValueError("env is not leased from this pool: it was never acquired or is already released")
+        idle = self.idle.setdefault(key, [])
+        if len(idle) < self.max_idle:
+            idle.append(env)
+        else:
+            env.close()
+
+    @contextmanager
+    def lease(self, rows=10, seats=5, render_mode=None, **env_kwargs):
+        env = self.acquire(rows, seats, render_mode, **env_kwargs)
+        try:
+            yield env
+        finally:
+            self.release(env)
+
+    def clear(self):
+        for idle in self.idle.values():
+            for env in idle:
+                env.close()
+        self.idle.clear()
+
+
+env_pool = EnvPool()
+
+
+# The strategies never read the observation, so they step through AirplaneEnv.step_fast,
+# which runs the same simulation without building one.
+
+def _step_function(env):
+    """step_fast on a bare AirplaneEnv. A wrapped env (make_env(checked=True), gym.make) is
+    stepped through env.step instead, so its checks also see the strategy's actions."""
+    if env is env.unwrapped:
+        return env.step_fast
+
+    def step(row_num):
+        _, reward, terminated, _, _ = env.step(row_num)
+        return reward, terminated
+    return step
 
 def random_strategy(env):
     """Pick random valid rows until boarding is done"""
-    obs, _ = env.reset()
+    env.reset()
+    sim = env.unwrapped
+    step = _step_function(env)
     total_reward, steps = 0, 0
 
     while True:
-        masks = env.unwrapped.action_masks()
+        masks = sim.action_masks()
         valid_actions = [i for i, valid in enumerate(masks) if valid]
         if not valid_actions:
             break
         action = np.random.choice(valid_actions)
 
-        obs, reward, terminated, _, _ = env.step(action)
+        reward, terminated = step(action)
         total_reward += reward
         steps += 1
         if terminated:
@@ -44,12 +112,14 @@ def random_strategy(env):
 
 def back_to_front(env):
     """Board passengers row by row, starting from the last row"""
-    obs, _ = env.reset()
+    env.reset()
+    sim = env.unwrapped
+    step = _step_function(env)
     total_reward, steps = 0, 0
 
-    for row in reversed(range(env.unwrapped.num_of_rows)):
-        while len(env.unwrapped.lobby.lobby_rows[row].passengers) > 0:
-            obs, reward, terminated, _, _ = env.step(row)
+    for row in reversed(range(sim.num_of_rows)):
+        while sim.lobby.lobby_rows[row].passengers:
+            reward, terminated = step(row)
             total_reward += reward
             steps += 1
             if terminated:
@@ -59,12 +129,14 @@ def back_to_front(env):
 
 def front_to_back(env):
     """Board row by row, starting from the front"""
-    obs, _ = env.reset()
+    env.reset()
+    sim = env.unwrapped
+    step = _step_function(env)
     total_reward, steps = 0, 0
 
-    for row in range(env.unwrapped.num_of_rows):
-        while len(env.unwrapped.lobby.lobby_rows[row].passengers) > 0:
-            obs, reward, terminated, _, _ = env.step(row)
+    for row in range(sim.num_of_rows):
+        while sim.lobby.lobby_rows[row].passengers:
+            reward, terminated = step(row)
             total_reward += reward
             steps += 1
             if terminated:
@@ -74,7 +146,9 @@ def front_to_back(env):
 
 def wilma(env):
     """Window -> Middle -> Aisle (WilMA)"""
-    obs, _ = env.reset()
+    env.reset()
+    sim = env.unwrapped
+    step = _step_function(env)
     total_reward, steps = 0, 0
 
     # heuristic seat priority for a 5-seat row: [window left, window right, mid-left, mid-right, aisle]
@@ -100,7 +174,7 @@ def wilma(env):
 
     for p in passengers:
         row = p.row_num
-        obs, reward, terminated, _, _ = env.step(row)
+        reward, terminated = step(row)
         total_reward += reward
         steps += 1
         if terminated:
@@ -0,0 +1,210 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from airplane_boarding import PassengerStatus, poisson_ticks
+from boarding_strategies import back_to_front, front_to_back, make_env, random_strategy, wilma
+
+heatmap_dir = os.path.join("logs", "congestion")
+
+strategies = {
+    "random": random_strategy,
+    "back_to_front": back_to_front,
+    "front_to_back": front_to_back,
+    "wilma": wilma,
+}
+
+STALLED, STOWING = PassengerStatus.STALLED, PassengerStatus.STOWING
+
+
+class CongestionHeatmap:
+    """Counts of STALLED and STOWING passengers per tick and aisle row, summed over episodes.
+
+    Pass `observe` as AirplaneEnv's tick_observer. Each tick it reads the aisle passengers'
+    statuses off the env, so the simulator carries no bookkeeping for it, and only appends flat
+    (tick, row) indices to Python lists; they are folded into the fixed histograms with
+    np.bincount every `flush_every` ticks. Column num_of_rows counts the stalled door queue.
+    Ticks from max_ticks on are added to the last tick bin. `ticks` holds how many episodes reached each tick, so
+    stalled / ticks is the mean number of stalled passengers at a row and tick.
+    """
+
+    def __init__(self, num_of_rows, max_ticks=512, flush_every=1 << 16):
+        self.num_of_rows = num_of_rows
+        self.max_ticks = max_ticks
+        self.width = num_of_rows + 1
+        self.flush_every = flush_every
+        self.stalled = np.zeros((max_ticks, self.width), dtype=np.int64)
+        self.stowing = np.zeros((max_ticks, self.width), dtype=np.int64)
+        self.ticks = np.zeros(max_ticks, dtype=np.int64)
+        self._stalled, self._stowing, self._ticks = [], [], []
+        self._door = [0] * max_ticks
+
+    def observe(self, env):
+        tick = env.boarding_time - 1
+        if tick >= self.max_ticks:
+            tick = self.max_ticks - 1
+        base = tick * self.width
+        line = env.boarding_line
+        stalled, stowing = self._stalled, self._stowing
+        for row, passenger in enumerate(line.aisle):
+            if passenger is not None:
+                status = passenger.status
+                if status is STALLED:
+                    stalled.append(base + row)
+                elif status is STOWING:
+                    stowing.append(base + row)
+        if line.queue and line.queue_status is STALLED:
+            self._door[tick] += len(line.queue)
+        ticks = self._ticks
+        ticks.append(tick)
+        if len(ticks) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        size = self.max_ticks * self.width
+        self.stalled += np.bincount(self._stalled, minlength=size).reshape(self.stalled.shape)
+        self.stowing += np.bincount(self._stowing, minlength=size).reshape(self.stowing.shape)
+        self.stalled[:, self.num_of_rows] += self._door
+        self.ticks += np.bincount(self._ticks, minlength=self.max_ticks)
+        self._stalled, self._stowing, self._ticks = [], [], []
+        self._door = [0] * self.max_ticks
+
+    def merge(self, other):
+        """Add another heatmap's counts, e.g. from a worker process"""
+        assert (other.num_of_rows, other.max_ticks) == (self.num_of_rows, self.max_ticks)
+        self.flush()
+        other.flush()
+        self.stalled += other.stalled
+        self.stowing += other.stowing
+        self.ticks += other.ticks
+        return self
+
+    def __getstate__(self):
+        # Pending indices go into the arrays before the heatmap is pickled to the parent process
+        self.flush()
+        return self.__dict__
+
+    @property
+    def episodes(self):
+        self.flush()
+        return int(self.ticks[0])
+
+    def mean(self, counts):
+        """Mean per episode that reached the tick, cut at the longest episode"""
+        self.flush()
+        used = int(np.count_nonzero(self.ticks))
+        return counts[:used] / np.maximum(self.ticks[:used, None], 1)
+
+    def save(self, path, **meta):
+        self.flush()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, stalled=self.stalled, stowing=self.stowing, ticks=self.ticks,
+                            num_of_rows=self.num_of_rows, **meta)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            heatmap = cls(int(data["num_of_rows"]), max_ticks=len(data["ticks"]))
+            heatmap.stalled += data["stalled"]
+            heatmap.stowing += data["stowing"]
+            heatmap.ticks += data["ticks"]
+        return heatmap
+
+
+def collect(strategy, episodes, num_of_rows=10, seats_per_row=5, max_ticks=512, seed=0, **env_kwargs):
+    """Run `episodes` episodes of a named strategy with a heatmap attached and return the heatmap"""
+    heatmap = CongestionHeatmap(num_of_rows, max_ticks)
+    env = make_env(num_of_rows, seats_per_row, tick_observer=heatmap.observe, **env_kwargs)
+    env.reset(seed=seed)
+    np.random.seed(seed)
+    for _ in range(episodes):
+        strategies[strategy](env)
+    env.close()
+    heatmap.flush()
+    return heatmap
+
+
+def _collect_chunk(args):
+    strategy, episodes, num_of_rows, seats_per_row, max_ticks, seed, stow_mean = args
+    env_kwargs = {"stow_time": poisson_ticks(stow_mean)} if stow_mean else {}
+    return strategy, collect(strategy, episodes, num_of_rows, seats_per_row, max_ticks, seed, **env_kwargs)
+
+
+def collect_parallel(strategy_names, episodes, num_of_rows=10, seats_per_row=5, max_ticks=512, stow_mean=None,
+                     chunk_episodes=10_000, workers=None):
+    """Heatmaps per strategy, collected in chunks over worker processes and merged"""
+    jobs = [(name, min(chunk_episodes, episodes - start), num_of_rows, seats_per_row, max_ticks, seed, stow_mean)
+            for name in strategy_names
+            for seed, start in enumerate(range(0, episodes, chunk_episodes))]
+    heatmaps = {name: CongestionHeatmap(num_of_rows, max_ticks) for name in strategy_names}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, heatmap in pool.map(_collect_chunk, jobs):
+            heatmaps[name].merge(heatmap)
+    return heatmaps
+
+
+def export(heatmaps, out_dir=heatmap_dir, image=True):
+    """Save each strategy's heatmap to <out_dir>/<strategy>.npz and, with matplotlib, a row x time PNG"""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, heatmap in heatmaps.items():
+        heatmap.save(os.path.join(out_dir, f"{name}.npz"), strategy=name)
+    if not image:
+        return
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    for name, heatmap in heatmaps.items():
+        fig, axs = plt.subplots(1, 2, figsize=(14, 5), sharey=True)
+        for ax, (title, counts) in zip(axs, (("STALLED", heatmap.stalled), ("STOWING", heatmap.stowing))):
+            im = ax.imshow(heatmap.mean(counts).T, aspect="auto", origin="lower", cmap="magma")
+            ax.set_title(f"{name}: mean {title} passengers ({heatmap.episodes} episodes)")
+            ax.set_xlabel("Tick")
+            fig.colorbar(im, ax=ax)
+        axs[0].set_ylabel(f"Aisle row (row {heatmap.num_of_rows} = door queue)")
+        fig.tight_layout()
+        fig.savefig(os.path.join(out_dir, f"{name}.png"))
+        plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect per-row, per-tick congestion heatmaps per strategy")
+    parser.add_argument("--strategies", nargs="+", default=sorted(strategies), choices=sorted(strategies))
+    parser.add_argument("--episodes", type=int, default=10_000, help="Episodes per strategy")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--stow-mean", type=float, help="Sample stow times with this mean (default: 1 tick)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=heatmap_dir)
+    parser.add_argument("--overhead", action="store_true", help="Also time episodes with and without the observer")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    heatmaps = collect_parallel(args.strategies, args.episodes, args.rows, args.seats, stow_mean=args.stow_mean,
+                                workers=args.workers)
+    export(heatmaps, args.out)
+    print(f"Collected {len(args.strategies)} x {args.episodes} episodes in {time.perf_counter() - start:.1f}s "
+          f"-> {args.out}")
+    for name, heatmap in heatmaps.items():
+        stalled = heatmap.stalled.sum() / heatmap.episodes
+        row_stalls = heatmap.stalled[:, :args.rows].sum(axis=0)
+        worst = f"most stalls at row {int(row_stalls.argmax())}" if row_stalls.any() else "no stalls in the aisle"
+        print(f"{name:15s} -> stalled passenger-ticks per episode {stalled:7.1f}, {worst}")
+
+    if args.overhead:
+        for name in args.strategies:
+            envs = [make_env(args.rows, args.seats), make_env(args.rows, args.seats,
+                                                              tick_observer=CongestionHeatmap(args.rows).observe)]
+            # Alternate between the two envs and keep the best of several rounds to reduce noise
+            timings = [float("inf")] * 2
+            for _ in range(5):
+                for i, env in enumerate(envs):
+                    np.random.seed(0)
+                    t = time.perf_counter()
+                    for _ in range(500):
+                        strategies[name](env)
+                    timings[i] = min(timings[i], time.perf_counter() - t)
+            print(f"{name:15s} -> observer overhead {timings[1] / timings[0] - 1:+.1%}")
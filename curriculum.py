@@ -0,0 +1,220 @@
+import argparse
+import os
+import time
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from airplane_boarding import AirplaneEnv, PassengerStatus
+from boarding_strategies import back_to_front, front_to_back, wilma
+
+curriculum_dir = os.path.join("models", "Curriculum")
+
+# Cabin sizes per stage. Sub-envs of a stage cycle through its sizes; the last stage mixes
+# sizes so the final policy keeps working on the smaller cabins as well
+default_stages = (
+    ((4, 3),),
+    ((6, 4),),
+    ((10, 5),),
+    ((10, 5), (14, 5), (20, 6)),
+)
+
+
+class PaddedCabin(gym.Wrapper):
+    """AirplaneEnv with an observation and action space that do not depend on the cabin size.
+
+    Rows are indexed by their distance from the door, so slot 0 is always the row next to the
+    door and the same slot means the same thing in every cabin. Each of the `max_rows` slots
+    has ROW_FEATURES values: whether the row exists, the share of its passengers still in the
+    lobby, the status of the passenger in its aisle slot (moving / stalled / stowing, one-hot),
+    how many rows that passenger still has to walk, and the passengers of this row waiting in
+    the door queue. A few cabin-wide values follow. Slots past the cabin are zero and their
+    actions are masked, so one policy can be trained and run on any cabin up to the maximum.
+    """
+    ROW_FEATURES = 7
+    CABIN_FEATURES = 5
+
+    def __init__(self, env, max_rows=20, max_seats=6):
+        super().__init__(env)
+        sim = env.unwrapped
+        assert sim.num_of_rows <= max_rows and sim.seats_per_row <= max_seats, "Cabin larger than the padding"
+        self.max_rows = max_rows
+        self.max_seats = max_seats
+        self.action_space = spaces.Discrete(max_rows)
+        self.observation_space = spaces.Box(low=0.0, high=1.0, dtype=np.float32,
+                                            shape=(max_rows * self.ROW_FEATURES + self.CABIN_FEATURES,))
+
+    def reset(self, seed=None, options=None):
+        _, info = self.env.reset(seed=seed, options=options)
+        return self._get_observation(), info
+
+    def step(self, action):
+        sim = self.env.unwrapped
+        _, reward, terminated, truncated, info = self.env.step(sim.num_of_rows - 1 - int(action))
+        return self._get_observation(), reward, terminated, truncated, info
+
+    def action_masks(self):
+        masks = [False] * self.max_rows
+        masks[:self.env.unwrapped.num_of_rows] = reversed(self.env.unwrapped.action_masks())
+        return masks
+
+    def _get_observation(self):
+        sim = self.env.unwrapped
+        last_row = sim.num_of_rows - 1
+        rows = np.zeros((self.max_rows, self.ROW_FEATURES), dtype=np.float32)
+        rows[:sim.num_of_rows, 0] = 1
+        for row in sim.lobby.lobby_rows:
+            rows[last_row - row.row_num, 1] = len(row.passengers) / self.max_seats
+        for slot, passenger in enumerate(sim.boarding_line.aisle):
+            if passenger is not None:
+                rows[last_row - slot, 2 + passenger.status.value] = 1
+                rows[last_row - slot, 5] = (slot - passenger.row_num) / self.max_rows
+        queue = sim.boarding_line.queue
+        for passenger in queue:
+            rows[last_row - passenger.row_num, 6] += 1 / self.max_seats
+        cabin = [
+            len(queue) / (self.max_rows * self.max_seats),
+            float(bool(queue) and sim.boarding_line.queue_status == PassengerStatus.STALLED),
+            sim.lobby.num_passengers / sim.num_of_seats,
+            sim.num_of_rows / self.max_rows,
+            sim.seats_per_row / self.max_seats,
+        ]
+        return np.concatenate([rows.ravel(), np.array(cabin, dtype=np.float32)])
+
+
+def make_padded_env(num_of_rows, seats_per_row, max_rows=20, max_seats=6):
+    return PaddedCabin(AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row), max_rows, max_seats)
+
+
+def _max_size(stages):
+    sizes = [size for stage in stages for size in stage]
+    return max(rows for rows, _ in sizes), max(seats for _, seats in sizes)
+
+
+def _make_vec_env(sizes, n_envs, max_rows, max_seats, seed):
+    from stable_baselines3.common.env_util import make_vec_env
+
+    # make_vec_env passes the same kwargs to every sub-env, so pick the size by creation order
+    cycle = iter(sizes[i % len(sizes)] for i in range(n_envs))
+    return make_vec_env(lambda: make_padded_env(*next(cycle), max_rows, max_seats), n_envs=n_envs, seed=seed)
+
+
+def policy_reward(model, env):
+    """Total reward of one deterministic episode (the simulator itself is deterministic)"""
+    obs, _ = env.reset()
+    total_reward, terminated = 0, False
+    while not terminated:
+        action, _ = model.predict(obs, action_masks=np.array(env.action_masks()), deterministic=True)
+        obs, reward, terminated, _, _ = env.step(action)
+        total_reward += reward
+    return total_reward
+
+
+def stage_targets(sizes, target=1.0):
+    """Reward to reach per cabin size: `target` times the best scripted strategy's reward"""
+    targets = {}
+    for rows, seats in sizes:
+        env = AirplaneEnv(num_of_rows=rows, seats_per_row=seats)
+        targets[rows, seats] = target * max(strategy(env)[1] for strategy in (back_to_front, front_to_back, wilma))
+    return targets
+
+
+def _train_stage(model, sizes, targets, max_rows, max_seats, max_timesteps, eval_freq):
+    """Train until the deterministic policy reaches its target on every size of the stage,
+    or the budget runs out. Returns (environment steps used, whether the targets were reached)."""
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    probes = {size: make_padded_env(*size, max_rows, max_seats) for size in sizes}
+
+    def reached():
+        return all(policy_reward(model, probes[size]) >= targets[size] for size in sizes)
+
+    class StopAtTargets(BaseCallback):
+        def _on_step(self):
+            return self.n_calls % max(eval_freq // self.training_env.num_envs, 1) != 0 or not reached()
+
+    if reached():
+        return 0, True
+    start = model.num_timesteps
+    model.learn(total_timesteps=max_timesteps, callback=StopAtTargets(), reset_num_timesteps=False)
+    return model.num_timesteps - start, reached()
+
+
+def train_curriculum(stages=default_stages, target=1.0, stage_timesteps=200_000, eval_freq=4_096, n_envs=4, ent_coef=0.1,
+                     device="cpu", seed=0, model=None, save_path=None, verbose=0, **ppo_kwargs):
+    """Train one MaskablePPO on growing cabins, keeping the weights from stage to stage.
+
+    Every stage trains on its sizes until the policy matches `target` times the best scripted
+    reward on each of them (or `stage_timesteps` run out), then the next stage continues with
+    the same network. Because PaddedCabin's spaces only depend on the largest size, the policy
+    never has to be rebuilt. Returns the model and per-stage (sizes, steps, reached).
+    """
+    from sb3_contrib import MaskablePPO
+
+    max_rows, max_seats = _max_size(stages)
+    history = []
+    for sizes in stages:
+        env = _make_vec_env(sizes, n_envs, max_rows, max_seats, seed)
+        if model is None:
+            model = MaskablePPO("MlpPolicy", env, device=device, seed=seed, verbose=verbose, ent_coef=ent_coef,
+                                **ppo_kwargs)
+        else:
+            model.set_env(env)
+        steps, reached = _train_stage(model, sizes, stage_targets(sizes, target), max_rows, max_seats,
+                                      stage_timesteps, eval_freq)
+        env.close()
+        history.append((sizes, steps, reached))
+        if verbose:
+            print(f"Stage {sizes}: {steps} steps, target {'reached' if reached else 'not reached'}")
+    if save_path:
+        model.save(save_path)
+    return model, history
+
+
+def train_from_scratch(sizes, target=1.0, max_timesteps=200_000, eval_freq=4_096, n_envs=4, ent_coef=0.1, device="cpu", seed=0,
+                       max_size=None, **ppo_kwargs):
+    """Baseline for the curriculum: the same padded setup trained directly on `sizes`.
+    Returns (environment steps used, whether the targets were reached)."""
+    from sb3_contrib import MaskablePPO
+
+    max_rows, max_seats = max_size or _max_size([sizes])
+    env = _make_vec_env(sizes, n_envs, max_rows, max_seats, seed)
+    model = MaskablePPO("MlpPolicy", env, device=device, seed=seed, ent_coef=ent_coef, **ppo_kwargs)
+    result = _train_stage(model, sizes, stage_targets(sizes, target), max_rows, max_seats, max_timesteps, eval_freq)
+    env.close()
+    return result
+
+
+def _parse_stage(text):
+    """'10x5,14x5' -> ((10, 5), (14, 5))"""
+    return tuple(tuple(int(n) for n in size.split("x")) for size in text.split(","))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train one MaskablePPO policy on a curriculum of growing cabins")
+    parser.add_argument("--stages", nargs="+", type=_parse_stage,
+                        help="Cabin sizes per stage, e.g. 4x3 6x4 10x5,14x5 (default: %s)" %
+                        " ".join(",".join(f"{r}x{s}" for r, s in stage) for stage in default_stages))
+    parser.add_argument("--target", type=float, default=1.0, help="Share of the best scripted reward to reach")
+    parser.add_argument("--stage-timesteps", type=int, default=200_000)
+    parser.add_argument("--n-envs", type=int, default=4)
+    parser.add_argument("--compare", action="store_true",
+                        help="Also train the last stage from scratch and compare environment steps")
+    args = parser.parse_args()
+
+    stages = tuple(args.stages) if args.stages else default_stages
+    os.makedirs(curriculum_dir, exist_ok=True)
+    start = time.perf_counter()
+    model, history = train_curriculum(stages, target=args.target, stage_timesteps=args.stage_timesteps,
+                                      n_envs=args.n_envs, save_path=os.path.join(curriculum_dir, "curriculum_model"))
+    for sizes, steps, reached in history:
+        print(f"{' '.join(f'{r}x{s}' for r, s in sizes):20s} -> {steps:8d} steps, "
+              f"target {'reached' if reached else 'not reached'}")
+    total = sum(steps for _, steps, _ in history)
+    print(f"Curriculum: {total} steps ({history[-1][1]} on the last stage) in {time.perf_counter() - start:.0f}s")
+
+    if args.compare:
+        steps, reached = train_from_scratch(stages[-1], target=args.target, max_timesteps=args.stage_timesteps,
+                                            n_envs=args.n_envs, max_size=_max_size(stages))
+        print(f"From scratch: {steps} steps, target {'reached' if reached else 'not reached'}")
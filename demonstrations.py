@@ -0,0 +1,263 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+from boarding_strategies import back_to_front, front_to_back, wilma
+
+demo_dir = os.path.join("models", "demonstrations")
+
+scripted = {
+    "back_to_front": back_to_front,
+    "front_to_back": front_to_back,
+    "wilma": wilma,
+}
+
+
+class RecordingEnv(AirplaneEnv):
+    """AirplaneEnv that records observation, mask, action and reward of every decision.
+
+    The scripted strategies drive the env through step_fast, so that is where recording happens.
+    `actions` holds the training labels and `taken` the rows actually stepped; `label` records a
+    different action than the one taken, for expert labels on detours.
+    """
+
+    def reset(self, seed=None, options=None):
+        self.observations, self.masks, self.actions, self.taken, self.rewards = [], [], [], [], []
+        return super().reset(seed=seed, options=options)
+
+    def step_fast(self, row_num, label=None):
+        self.observations.append(self._get_observation())
+        self.masks.append(self.action_masks())
+        self.actions.append(row_num if label is None else label)
+        self.taken.append(row_num)
+        reward, terminated = super().step_fast(row_num)
+        self.rewards.append(reward)
+        return reward, terminated
+
+
+class SolverExpert:
+    """Reward-optimal rows from OptimalSolver (small cabins only), following the rows actually taken"""
+
+    def __init__(self, num_of_rows, seats_per_row):
+        from optimal_solver import OptimalSolver
+
+        self.solver = OptimalSolver(num_of_rows, seats_per_row)
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * num_of_rows * seats_per_row + 100))
+        self.reset()
+
+    def reset(self):
+        self.state = self.solver.initial_state()
+
+    def __call__(self, env):
+        return self.solver.best_action(self.state)
+
+    def observe(self, row_num):
+        self.state = self.solver.next_state(self.state, row_num)
+
+
+def _planner(num_of_rows, seats_per_row):
+    from policy_table import RolloutPlanner
+    return RolloutPlanner(num_of_rows, seats_per_row)
+
+
+experts = {
+    "planner": _planner,
+    "solver": SolverExpert,
+}
+
+
+def _expert_episode(env, expert, rng, explore):
+    """Label every state with the expert's row, but take a random valid row with probability explore,
+    so the demonstrations also show how to recover from states off the expert's own path"""
+    env.reset()
+    if hasattr(expert, "reset"):
+        expert.reset()
+    while not env.terminated:
+        label = taken = expert(env)
+        if rng.random() < explore:
+            taken = int(rng.choice(np.flatnonzero(env.action_masks())))
+        env.step_fast(taken, label=label)
+        if hasattr(expert, "observe"):
+            expert.observe(taken)
+
+
+def record(sources=("planner",), num_of_rows=10, seats_per_row=5, expert_episodes=50, explore=0.1, seed=0):
+    """Collect demonstrations and return them as a dict of arrays.
+
+    `sources` are names from `scripted` or `experts`. The scripted strategies and the simulator
+    are deterministic, so each of them contributes one episode; experts run `expert_episodes`
+    episodes with random detours.
+    """
+    env = RecordingEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    rng = np.random.default_rng(seed)
+    observations, masks, actions, taken, rewards, episode_ends = [], [], [], [], [], []
+
+    def collect():
+        observations.extend(env.observations)
+        masks.extend(env.masks)
+        actions.extend(env.actions)
+        taken.extend(env.taken)
+        rewards.extend(env.rewards)
+        episode_ends.append(len(actions))
+
+    for source in sources:
+        if source in experts:
+            expert = experts[source](num_of_rows, seats_per_row)
+            for _ in range(expert_episodes):
+                _expert_episode(env, expert, rng, explore)
+                collect()
+        else:
+            scripted[source](env)
+            collect()
+
+    # Seat numbers and statuses fit in int16, which keeps the file small
+    return {
+        "num_of_rows": np.array(num_of_rows),
+        "seats_per_row": np.array(seats_per_row),
+        "observations": np.array(observations, dtype=np.int16),
+        "action_masks": np.array(masks, dtype=bool),
+        "actions": np.array(actions, dtype=np.int16),
+        "taken": np.array(taken, dtype=np.int16),
+        "rewards": np.array(rewards, dtype=np.float32),
+        "episode_ends": np.array(episode_ends, dtype=np.int64),
+    }
+
+
+def save_dataset(path, dataset):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **dataset)
+
+
+def load_dataset(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def check_cabin(dataset, num_of_rows, seats_per_row):
+    """Raise ValueError unless the dataset was recorded on a num_of_rows x seats_per_row cabin.
+    Datasets saved before the cabin was stored are checked by their observation and mask sizes."""
+    if "num_of_rows" in dataset:
+        cabin = (int(dataset["num_of_rows"]), int(dataset["seats_per_row"]))
+        if cabin != (num_of_rows, seats_per_row):
+            raise ValueError(f"Demonstrations were recorded on a {cabin[0]}x{cabin[1]} cabin, "
+                             f"not {num_of_rows}x{seats_per_row}")
+    elif (dataset["observations"].shape[1], dataset["action_masks"].shape[1]) != (2 * num_of_rows * seats_per_row,
+                                                                                  num_of_rows):
+        raise ValueError(f"Demonstrations with observations of size {dataset['observations'].shape[1]} and "
+                         f"{dataset['action_masks'].shape[1]} actions do not fit a {num_of_rows}x{seats_per_row} cabin")
+
+
+def discounted_returns(rewards, episode_ends, gamma):
+    returns = np.zeros(len(rewards), dtype=np.float32)
+    start = 0
+    for end in episode_ends:
+        running = 0.0
+        for i in reversed(range(start, end)):
+            running = rewards[i] + gamma * running
+            returns[i] = running
+        start = end
+    return returns
+
+
+def pretrain(model, dataset, epochs=20, batch_size=256, learning_rate=1e-3, vf_coef=0.5, seed=0):
+    """Masked behaviour cloning of a MaskablePPO policy on a demonstration dataset.
+
+    The actor is trained to maximise the log-probability of the demonstrated rows under the
+    recorded action masks, and the critic regresses the discounted demonstration returns, so
+    PPO does not start from a value function that is far off. Returns per-epoch
+    (loss, action accuracy).
+    """
+    import torch as th
+    from torch.nn import functional as F
+
+    policy = model.policy
+    device = policy.device
+    observations = th.as_tensor(dataset["observations"], dtype=th.float32, device=device)
+    masks = th.as_tensor(dataset["action_masks"], device=device)
+    actions = th.as_tensor(dataset["actions"], dtype=th.long, device=device)
+    returns = th.as_tensor(discounted_returns(dataset["rewards"], dataset["episode_ends"], model.gamma), device=device)
+
+    optimizer = th.optim.Adam(policy.parameters(), lr=learning_rate)
+    generator = th.Generator().manual_seed(seed)
+    history = []
+    policy.set_training_mode(True)
+    for _ in range(epochs):
+        total_loss = correct = 0.0
+        for batch in th.randperm(len(actions), generator=generator).split(batch_size):
+            values, log_prob, _ = policy.evaluate_actions(observations[batch], actions[batch],
+                                                          action_masks=masks[batch])
+            loss = -log_prob.mean() + vf_coef * F.mse_loss(values.flatten(), returns[batch])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(batch)
+            with th.no_grad():
+                distribution = policy.get_distribution(observations[batch], action_masks=masks[batch])
+                correct += (distribution.distribution.probs.argmax(dim=1) == actions[batch]).sum().item()
+        history.append((total_loss / len(actions), correct / len(actions)))
+    policy.set_training_mode(False)
+    return history
+
+
+def steps_to_threshold(num_of_rows, seats_per_row, reward_threshold, dataset=None, max_timesteps=200_000,
+                       eval_freq=2_048, n_envs=4, seed=0):
+    """Environment steps MaskablePPO needs until a deterministic episode reaches reward_threshold,
+    with or without a behaviour-cloning warm start. Returns None if the budget runs out."""
+    from sb3_contrib import MaskablePPO
+    from stable_baselines3.common.callbacks import BaseCallback
+    from stable_baselines3.common.env_util import make_vec_env
+    from policy_table import _episode_reward
+
+    probe = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+
+    def reached(model):
+        def choose(env):
+            action, _ = model.predict(env._get_observation(), action_masks=np.array(env.action_masks()),
+                                      deterministic=True)
+            return int(action)
+        return _episode_reward(probe, choose) >= reward_threshold
+
+    class StopAtThreshold(BaseCallback):
+        def _on_step(self):
+            return self.num_timesteps % eval_freq >= self.training_env.num_envs or not reached(self.model)
+
+    env = make_vec_env(AirplaneEnv, n_envs=n_envs, seed=seed,
+                       env_kwargs={"num_of_rows": num_of_rows, "seats_per_row": seats_per_row})
+    model = MaskablePPO("MlpPolicy", env, device="cpu", seed=seed, ent_coef=0.1)
+    if dataset is not None:
+        pretrain(model, dataset, seed=seed)
+        if reached(model):
+            return 0
+    model.learn(total_timesteps=max_timesteps, callback=StopAtThreshold())
+    env.close()
+    return model.num_timesteps if reached(model) else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record expert demonstrations for behaviour cloning")
+    parser.add_argument("--sources", nargs="+", default=["planner"], choices=sorted(scripted) + sorted(experts),
+                        help="'solver' is exact but only practical for small cabins such as 3x5")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--expert-episodes", type=int, default=50)
+    parser.add_argument("--explore", type=float, default=0.1)
+    parser.add_argument("--out", help="Output .npz (default: models/demonstrations/<rows>x<seats>.npz)")
+    parser.add_argument("--compare", type=float, metavar="REWARD",
+                        help="Also train with and without the warm start and report steps to reach REWARD")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(demo_dir, f"{args.rows}x{args.seats}.npz")
+    start = time.perf_counter()
+    dataset = record(args.sources, args.rows, args.seats, expert_episodes=args.expert_episodes, explore=args.explore)
+    save_dataset(out, dataset)
+    print(f"Saved {len(dataset['actions'])} decisions from {len(dataset['episode_ends'])} episodes to {out} "
+          f"({os.path.getsize(out) / 1024:.1f} kB) in {time.perf_counter() - start:.1f}s")
+
+    if args.compare is not None:
+        for name, data in (("scratch", None), ("bc warm start", dataset)):
+            steps = steps_to_threshold(args.rows, args.seats, args.compare, dataset=data)
+            print(f"{name:15s} -> {'not reached' if steps is None else f'{steps} steps'} to reward {args.compare}")
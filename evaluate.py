@@ -0,0 +1,96 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.utils import get_action_masks
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from airplane_boarding import AirplaneEnv
+from boarding_strategies import make_env, random_strategy, back_to_front, front_to_back, wilma
+
+model_dir = os.path.join("models", "MaskablePPO")
+
+strategies = {
+    "Random": random_strategy,
+    "Back-to-Front": back_to_front,
+    "Front-to-Back": front_to_back,
+    "WilMA": wilma,
+}
+
+
+def evaluate_model(model_name, episodes=500, n_envs=16, rows=10, seats=5, device="cpu",
+                   deterministic=False, subproc=False):
+    """Run `episodes` boardings of a saved model across a vector env.
+
+    Observations and action masks are batched over all `n_envs` envs, so there is one
+    `predict` call per vector step instead of one per env. The simulator itself is
+    deterministic, so a deterministic policy yields the same boarding every episode;
+    sampling (the default) gives the spread of the learned action distribution.
+    Returns arrays of boarding times (ticks) and total rewards.
+    """
+    vec_env = make_vec_env(AirplaneEnv, n_envs=n_envs, env_kwargs={"num_of_rows": rows, "seats_per_row": seats},
+                           vec_env_cls=SubprocVecEnv if subproc else DummyVecEnv)
+    model = MaskablePPO.load(os.path.join(model_dir, model_name), device=device)
+
+    boarding_times, total_rewards = [], []
+    episode_rewards = np.zeros(n_envs)
+    obs = vec_env.reset()
+    while len(boarding_times) < episodes:
+        action_masks = get_action_masks(vec_env)
+        actions, _ = model.predict(obs, action_masks=action_masks, deterministic=deterministic)
+        obs, rewards, dones, infos = vec_env.step(actions)
+        episode_rewards += rewards
+        for i in np.flatnonzero(dones):
+            boarding_times.append(infos[i]["boarding_time"])
+            total_rewards.append(episode_rewards[i])
+            episode_rewards[i] = 0
+    vec_env.close()
+
+    return np.array(boarding_times[:episodes]), np.array(total_rewards[:episodes])
+
+
+def evaluate_strategy(strategy_func, episodes=500, rows=10, seats=5):
+    """Run a scripted strategy from boarding_strategies and return boarding times and rewards"""
+    env = make_env(rows=rows, seats=seats)
+    boarding_times, total_rewards = [], []
+    for _ in range(episodes):
+        _, reward = strategy_func(env)
+        boarding_times.append(env.unwrapped.boarding_time)
+        total_rewards.append(reward)
+    env.close()
+    return np.array(boarding_times), np.array(total_rewards)
+
+
+def summarize(name, boarding_times, total_rewards):
+    p5, p50, p95 = np.percentile(boarding_times, [5, 50, 95])
+    print(f"{name:15s} -> Time: mean {boarding_times.mean():7.2f} std {boarding_times.std():6.2f} "
+          f"p5 {p5:6.1f} p50 {p50:6.1f} p95 {p95:6.1f} | Reward: {total_rewards.mean():8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a trained MaskablePPO model with the scripted strategies")
+    parser.add_argument("model", nargs="?", default="best_model", help="Model name under models/MaskablePPO")
+    parser.add_argument("--episodes", type=int, default=500)
+    parser.add_argument("--n-envs", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--deterministic", action="store_true", help="Always take the most likely action")
+    parser.add_argument("--subproc", action="store_true", help="Use SubprocVecEnv instead of DummyVecEnv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    times, rewards = evaluate_model(args.model, args.episodes, args.n_envs, args.rows, args.seats,
+                                    args.device, args.deterministic, args.subproc)
+    summarize(args.model, times, rewards)
+    for name, strategy in strategies.items():
+        times, rewards = evaluate_strategy(strategy, args.episodes, args.rows, args.seats)
+        summarize(name, times, rewards)
+    print(f"\nEvaluated in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
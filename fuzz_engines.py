@@ -0,0 +1,314 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+
+default_sizes = [(1, 1), (1, 3), (2, 2), (3, 3), (3, 5), (4, 2), (5, 3), (10, 5)]
+
+
+def _random_rows(rng, masks, history):
+    return int(rng.choice(np.flatnonzero(masks)))
+
+
+def _back_to_front(rng, masks, history):
+    # Longest possible queue outside the door
+    return int(np.flatnonzero(masks)[-1])
+
+
+def _front_to_back(rng, masks, history):
+    return int(np.flatnonzero(masks)[0])
+
+
+def _alternate_ends(rng, masks, history):
+    valid = np.flatnonzero(masks)
+    return int(valid[0] if len(history) % 2 else valid[-1])
+
+
+def _sticky_rows(rng, masks, history):
+    # Repeat the previous row while possible, so passengers of one row pile up behind each other
+    if history and masks[history[-1]] and rng.random() < 0.8:
+        return history[-1]
+    return _random_rows(rng, masks, history)
+
+
+action_generators = [_random_rows, _random_rows, _sticky_rows, _back_to_front, _front_to_back, _alternate_ends]
+
+
+class EnginePair:
+    """Reference and candidate env of one cabin size, reused across episodes"""
+
+    def __init__(self, reference_factory, candidate_factory, num_of_rows, seats_per_row):
+        self.num_of_rows = num_of_rows
+        self.seats_per_row = seats_per_row
+        self.reference = reference_factory(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+        self.candidate = candidate_factory(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+
+    def replay(self, actions, generator=None, rng=None):
+        """Step both envs in lockstep and return the first mismatch, or None.
+
+        After every step each env is reduced to a fingerprint (observation bytes, reward,
+        terminated, truncated, info and masks), which is one tuple comparison; the fields are
+        only compared one by one to report a mismatch. With a generator, actions are chosen from
+        the reference masks and appended to `actions` as the episode runs.
+        """
+        ref_obs, _ = self.reference.reset(seed=0)
+        cand_obs, _ = self.candidate.reset(seed=0)
+        if not np.array_equal(ref_obs, cand_obs):
+            return {"step": -1, "field": "observation", "reference": ref_obs.tolist(), "candidate": cand_obs.tolist()}
+
+        ref_masks = self.reference.action_masks()
+        step = 0
+        while generator is not None or step < len(actions):
+            if generator is not None:
+                actions.append(generator(rng, ref_masks, actions))
+            action = actions[step]
+            expected = self.reference.step(action)
+            try:
+                actual = self.candidate.step(action)
+            except Exception as e:
+                return {"step": step, "field": "exception", "reference": None, "candidate": repr(e)}
+            ref_masks, cand_masks = self.reference.action_masks(), self.candidate.action_masks()
+            if _fingerprint(expected, ref_masks) != _fingerprint(actual, cand_masks):
+                return _first_difference(step, expected + (ref_masks,), actual + (cand_masks,))
+            if expected[2]:
+                break
+            step += 1
+        return None
+
+    def close(self):
+        self.reference.close()
+        self.candidate.close()
+
+
+class DrainToEnd:
+    """Bounded-drain AirplaneEnv that keeps stepping until the drain is done, so one step
+    matches one step of the reference"""
+
+    def __init__(self, **kwargs):
+        self.env = AirplaneEnv(**kwargs)
+
+    def reset(self, seed=None):
+        return self.env.reset(seed=seed)
+
+    def step(self, action):
+        obs, total_reward, terminated, truncated, info = self.env.step(action)
+        while info.get("drain_pending"):
+            obs, reward, terminated, truncated, info = self.env.step(0)
+            total_reward += reward
+        return obs, total_reward, terminated, truncated, info
+
+    def action_masks(self):
+        return self.env.action_masks()
+
+    def close(self):
+        self.env.close()
+
+
+def _plain(value):
+    return value.tolist() if isinstance(value, np.ndarray) else value
+
+
+def _fingerprint(transition, masks):
+    obs, reward, terminated, truncated, info = transition
+    return np.asarray(obs).tobytes(), reward, terminated, truncated, info, [bool(m) for m in masks]
+
+
+def _first_difference(step, expected, actual):
+    for field, ref_value, cand_value in zip(("observation", "reward", "terminated", "truncated", "info",
+                                             "action_masks"), expected, actual):
+        if field == "observation":
+            same = np.array_equal(ref_value, cand_value)
+        elif field == "action_masks":
+            same = [bool(m) for m in ref_value] == [bool(m) for m in cand_value]
+        else:
+            same = ref_value == cand_value
+        if not same:
+            return {"step": step, "field": field, "reference": _plain(ref_value), "candidate": _plain(cand_value)}
+    return {"step": step, "field": "observation", "reference": None, "candidate": "same values, different dtype"}
+
+
+def _valid_prefix(actions, num_of_rows, seats_per_row):
+    """Drop actions that are out of range or exceed a row's passengers in a smaller cabin"""
+    left = [seats_per_row] * num_of_rows
+    kept = []
+    for action in actions:
+        if action < num_of_rows and left[action] > 0:
+            left[action] -= 1
+            kept.append(action)
+    return kept
+
+
+def shrink(reference_factory, candidate_factory, num_of_rows, seats_per_row, actions, mismatch):
+    """Reduce a failing case to a smaller cabin and fewer actions that still diverge.
+
+    `mismatch` is what the fuzzing run saw. Cases are shrunk on fresh envs, so a divergence
+    that needs state left over from earlier episodes (e.g. a warm transition cache) does not
+    reproduce; it is returned unshrunk with reproducible=False.
+    """
+    def fails(rows, seats, acts):
+        pair = EnginePair(reference_factory, candidate_factory, rows, seats)
+        try:
+            return pair.replay(acts)
+        finally:
+            pair.close()
+
+    actions = actions[:mismatch["step"] + 1]
+    fresh = fails(num_of_rows, seats_per_row, actions)
+    if fresh is None:
+        return {"num_of_rows": num_of_rows, "seats_per_row": seats_per_row, "actions": actions, **mismatch,
+                "reproducible": False}
+    mismatch = fresh
+    actions = actions[:mismatch["step"] + 1]
+    changed = True
+    while changed:
+        changed = False
+        for rows, seats in ((num_of_rows - 1, seats_per_row), (num_of_rows, seats_per_row - 1)):
+            if rows < 1 or seats < 1:
+                continue
+            smaller = _valid_prefix(actions, rows, seats)
+            result = fails(rows, seats, smaller)
+            if result is not None:
+                num_of_rows, seats_per_row, mismatch = rows, seats, result
+                actions = smaller[:result["step"] + 1]
+                changed = True
+                break
+        if changed:
+            continue
+        for i in range(len(actions)):
+            shorter = actions[:i] + actions[i + 1:]
+            result = fails(num_of_rows, seats_per_row, shorter)
+            if result is not None:
+                mismatch = result
+                actions = shorter[:result["step"] + 1]
+                changed = True
+                break
+
+    return {"num_of_rows": num_of_rows, "seats_per_row": seats_per_row, "actions": actions, **mismatch,
+            "reproducible": True}
+
+
+def _fuzz_size(args):
+    """Episodes on one cabin size, in a worker process. Returns (episodes run, shrunk failures)."""
+    candidate_factory, reference_factory, num_of_rows, seats_per_row, episodes, seed, max_failures = args
+    rng = np.random.default_rng(seed)
+    pair = EnginePair(reference_factory, candidate_factory, num_of_rows, seats_per_row)
+    failures = []
+    try:
+        for episode in range(episodes):
+            generator = action_generators[rng.integers(len(action_generators))]
+            actions = []
+            mismatch = pair.replay(actions, generator, rng)
+            if mismatch is None:
+                continue
+            failures.append(shrink(reference_factory, candidate_factory, num_of_rows, seats_per_row, actions,
+                                   mismatch))
+            if len(failures) >= max_failures:
+                return episode + 1, failures
+    finally:
+        pair.close()
+    return episodes, failures
+
+
+def differential_fuzz(candidate_factory, reference_factory=AirplaneEnv, sizes=default_sizes, episodes=1000, seed=0,
+                      max_failures=1, workers=None):
+    """Compare a candidate engine with the reference simulator on random and adversarial episodes.
+
+    Both factories are called as factory(num_of_rows=..., seats_per_row=...) and must return
+    envs with reset/step/action_masks. Observations, rewards, termination, truncation, info and
+    masks are compared after every step. Episodes are split evenly over the cabin sizes, and
+    the sizes over worker processes, so the factories must be picklable (module-level
+    functions, classes or functools.partial). Each size reuses its envs across episodes, like a
+    training loop would. Returns (episodes run, shrunk failures).
+    """
+    jobs = [(candidate_factory, reference_factory, rows, seats, episodes // len(sizes) + (i < episodes % len(sizes)),
+             (seed, i), max_failures) for i, (rows, seats) in enumerate(sizes)]
+    workers = min(workers or os.cpu_count(), len(jobs))
+    if workers == 1:
+        results = list(map(_fuzz_size, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_fuzz_size, jobs))
+    failures = [failure for _, size_failures in results for failure in size_failures]
+    return sum(size_episodes for size_episodes, _ in results), failures[:max_failures]
+
+
+class CacheHitRewardBug(AirplaneEnv):
+    """Transition cache that adds 1 to the reward of every hit. Fresh envs start with a cold cache,
+    so the bug only shows after earlier episodes filled it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(transition_cache_size=4096, **kwargs)
+
+    def _cached_step(self, row_num):
+        hits = self.transition_cache.hits
+        reward = super()._cached_step(row_num)
+        return reward + (self.transition_cache.hits > hits)
+
+
+class SeatObservationBug(AirplaneEnv):
+    """Observation off by one while exactly two passengers wait in the lobby, with the same
+    rewards and masks as the reference"""
+
+    def _get_observation(self):
+        observation = super()._get_observation()
+        if self.lobby.count_passengers() == 2:
+            observation = observation.copy()
+            observation[0] += 1
+        return observation
+
+
+def self_test(episodes=400, workers=None):
+    """Check the harness on engines with planted bugs: each must be reported, none may crash it.
+    Returns the names of the planted bugs that were missed."""
+    missed = []
+    for name, factory in planted_bugs.items():
+        _, failures = differential_fuzz(factory, episodes=episodes, workers=workers)
+        if not failures:
+            missed.append(name)
+    return missed
+
+
+# Engines that must behave exactly like the reference AirplaneEnv
+candidates = {
+    "transition-cache": partial(AirplaneEnv, transition_cache_size=4096),
+    "bounded-drain": partial(DrainToEnd, max_drain_ticks=1),
+    "bounded-drain-cache": partial(DrainToEnd, max_drain_ticks=3, transition_cache_size=4096),
+}
+
+# Engines that must not pass, for self_test
+planted_bugs = {
+    "cache-hit-reward": CacheHitRewardBug,
+    "seat-observation": SeatObservationBug,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Differential fuzzing of fast engines against AirplaneEnv")
+    parser.add_argument("--candidate", choices=sorted(candidates), default=None, help="Default: all candidates")
+    parser.add_argument("--episodes", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per CPU, at most one per cabin size")
+    parser.add_argument("--self-test", action="store_true", help="First check that planted bugs are reported")
+    args = parser.parse_args()
+
+    failed = False
+    if args.self_test:
+        missed = self_test(workers=args.workers)
+        failed = bool(missed)
+        print(f"self test: {len(planted_bugs) - len(missed)}/{len(planted_bugs)} planted bugs reported"
+              + (f", missed {missed}" if missed else ""))
+    for name in [args.candidate] if args.candidate else sorted(candidates):
+        start = time.perf_counter()
+        episodes, failures = differential_fuzz(candidates[name], episodes=args.episodes, seed=args.seed,
+                                               workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {episodes} episodes in {elapsed:.2f}s ({episodes / elapsed:,.0f}/s), {len(failures)} failures")
+        for failure in failures:
+            failed = True
+            print(f"  minimal reproduction: {failure}")
+    raise SystemExit(1 if failed else 0)
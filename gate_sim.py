@@ -0,0 +1,252 @@
+import argparse
+import heapq
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+
+
+class GateFlight(AirplaneEnv):
+    """AirplaneEnv whose lobby starts empty and fills up as passengers arrive at the gate.
+
+    Time is driven from outside: tick(row_num) boards a passenger from that row and runs one
+    tick, tick(None) runs an idle tick with nobody boarding (the lobby is empty but passengers
+    are still on their way). The flight is done once everyone has arrived and sat down.
+    """
+
+    def reset(self, seed=None, options=None):
+        result = super().reset(seed=seed, options=options)
+        self.lobby.truncate([0] * self.num_of_rows)
+        self.to_arrive = self.num_of_seats
+        return result
+
+    def arrive(self, seat_num):
+        self.lobby.add_passenger(self.passengers[seat_num])
+        self.to_arrive -= 1
+
+    def tick(self, row_num=None):
+        if row_num is not None:
+            self.boarding_line.add_passenger(self.lobby.remove_passenger(row_num))
+        self._move()
+        return self._calculate_reward()
+
+    @property
+    def done(self):
+        return self.to_arrive == 0 and not self.is_onboarding()
+
+
+def far_end_first(env):
+    """Board a waiting passenger of the row furthest from the door (row 0)"""
+    return next(row for row, valid in enumerate(env.action_masks()) if valid)
+
+
+class Flight:
+    __slots__ = ("number", "num_of_rows", "seats_per_row", "open_time", "board_time", "departure_time",
+                 "env", "arrivals", "start_time", "reward", "idle_ticks")
+
+    def __init__(self, number, num_of_rows, seats_per_row, open_time, board_time, departure_time):
+        self.number = number
+        self.num_of_rows = num_of_rows
+        self.seats_per_row = seats_per_row
+        self.open_time = open_time
+        self.board_time = board_time
+        self.departure_time = departure_time
+        self.env = self.arrivals = self.start_time = None
+        self.reward = self.idle_ticks = 0
+
+
+def poisson_arrivals(rng, num_passengers, start, mean_gap):
+    """(time, seat) of each passenger of a flight: a Poisson stream from `start`, seats in random order"""
+    t = start
+    for seat_num in rng.permutation(num_passengers):
+        t += rng.exponential(mean_gap)
+        yield t, int(seat_num)
+
+
+def flight_schedule(rng, num_flights, mean_gap=20.0, sizes=((10, 5),), open_ahead=100, board_ahead=60):
+    """Departures of one day, in order: Poisson spaced, cabin size drawn from `sizes`. The gate
+    opens open_ahead ticks before departure and boarding starts board_ahead ticks before it."""
+    t = open_ahead
+    for number in range(num_flights):
+        t += rng.exponential(mean_gap)
+        rows, seats = sizes[rng.integers(len(sizes))]
+        yield Flight(number, rows, seats, t - open_ahead, t - board_ahead, t)
+
+
+class RunningStats:
+    """Count, mean, standard deviation and maximum in constant memory (Welford)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = self._m2 = 0.0
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        return {"mean": self.mean, "std": self.std, "max": self.max}
+
+
+# Event kinds, in the order they are handled when they fall on the same time
+ARRIVAL, OPEN, BOARD, TICK = range(4)
+
+
+class GateSimulation:
+    """Discrete-event simulation of a gate area boarding a stream of flights with shared staff.
+
+    Flights come lazily from a schedule iterator and passengers from one arrival generator per
+    flight, and the event heap only ever holds the next event of each open flight, so memory
+    depends on how many flights are open at once, not on how many are simulated. Boarding a
+    flight takes one of `num_staff` gate agents from its start to its last passenger seated;
+    flights wait in turn when none is free. Finished environments are reused.
+    """
+
+    def __init__(self, schedule, num_staff=6, policy=far_end_first, arrival_gap=None, seed=0):
+        self.schedule = iter(schedule)
+        self.num_staff = num_staff
+        self.policy = policy
+        # Mean ticks between two passengers of a flight; by default they are spread over the
+        # time from gate opening to departure, so some arrive after boarding has started
+        self.arrival_gap = arrival_gap
+        self.rng = np.random.default_rng(seed)
+        self.events = []
+        self.sequence = 0
+        self.free_envs = {}
+        self.free_staff = num_staff
+        self.waiting = deque()
+        self.now = 0.0
+        self.open_flights = self.peak_open_flights = self.peak_events = 0
+        self.flights = self.passengers = 0
+        self.stats = {name: RunningStats() for name in
+                      ("staff_wait", "boarding_ticks", "idle_ticks", "departure_delay", "reward")}
+
+    def _push(self, time, kind, flight, payload=None):
+        self.sequence += 1
+        heapq.heappush(self.events, (time, kind, self.sequence, flight, payload))
+        self.peak_events = max(self.peak_events, len(self.events))
+
+    def _open_next_flight(self):
+        flight = next(self.schedule, None)
+        if flight is not None:
+            self._push(flight.open_time, OPEN, flight)
+
+    def _env(self, flight):
+        free = self.free_envs.setdefault((flight.num_of_rows, flight.seats_per_row), [])
+        env = free.pop() if free else GateFlight(num_of_rows=flight.num_of_rows, seats_per_row=flight.seats_per_row)
+        env.reset()
+        return env
+
+    def _next_arrival(self, flight):
+        arrival = next(flight.arrivals, None)
+        if arrival is not None:
+            self._push(arrival[0], ARRIVAL, flight, arrival[1])
+
+    def _start_boarding(self, flight):
+        self.free_staff -= 1
+        flight.start_time = self.now
+        self._push(self.now, TICK, flight)
+
+    def _finish(self, flight):
+        env = flight.env
+        self.stats["staff_wait"].add(flight.start_time - flight.board_time)
+        self.stats["boarding_ticks"].add(env.boarding_time)
+        self.stats["idle_ticks"].add(flight.idle_ticks)
+        self.stats["departure_delay"].add(max(self.now - flight.departure_time, 0.0))
+        self.stats["reward"].add(flight.reward)
+        self.flights += 1
+        self.passengers += env.num_of_seats
+        self.open_flights -= 1
+        self.free_envs[env.num_of_rows, env.seats_per_row].append(env)
+        flight.env = flight.arrivals = None
+
+        self.free_staff += 1
+        if self.waiting:
+            self._start_boarding(self.waiting.popleft())
+
+    def run(self):
+        """Simulate until the schedule is exhausted and every flight has left. Returns report()."""
+        start = time.perf_counter()
+        self._open_next_flight()
+        while self.events:
+            self.now, kind, _, flight, payload = heapq.heappop(self.events)
+            if kind == OPEN:
+                # Open the next flight only now, so the schedule is read as the day goes on
+                self._open_next_flight()
+                self.open_flights += 1
+                self.peak_open_flights = max(self.peak_open_flights, self.open_flights)
+                flight.env = self._env(flight)
+                gap = self.arrival_gap or (flight.departure_time - flight.open_time) / flight.env.num_of_seats
+                flight.arrivals = poisson_arrivals(self.rng, flight.env.num_of_seats, self.now, gap)
+                self._next_arrival(flight)
+                self._push(flight.board_time, BOARD, flight)
+            elif kind == ARRIVAL:
+                flight.env.arrive(payload)
+                self._next_arrival(flight)
+            elif kind == BOARD:
+                if self.free_staff:
+                    self._start_boarding(flight)
+                else:
+                    self.waiting.append(flight)
+            else:
+                env = flight.env
+                if env.lobby.count_passengers():
+                    flight.reward += env.tick(self.policy(env))
+                else:
+                    flight.reward += env.tick()
+                    # Nobody to board although passengers are still on their way to the gate
+                    flight.idle_ticks += env.to_arrive > 0
+                if env.done:
+                    self._finish(flight)
+                else:
+                    self._push(self.now + 1, TICK, flight)
+        return self.report(time.perf_counter() - start)
+
+    def report(self, wall_time=None):
+        report = {
+            "flights": self.flights,
+            "passengers": self.passengers,
+            "sim_ticks": self.now,
+            "flights_per_1000_ticks": 1000 * self.flights / self.now if self.now else 0.0,
+            "peak_open_flights": self.peak_open_flights,
+            "peak_events": self.peak_events,
+            **{name: stats.summary() for name, stats in self.stats.items()},
+        }
+        if wall_time:
+            report["wall_s"] = wall_time
+            report["flights_per_s"] = self.flights / wall_time
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a gate area boarding a day of departures")
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--gap", type=float, default=20.0, help="Mean ticks between departures")
+    parser.add_argument("--staff", type=int, default=6)
+    parser.add_argument("--sizes", nargs="+", default=["10x5"], help="Cabin sizes, e.g. 10x5 20x6")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes]
+    rng = np.random.default_rng(args.seed)
+    simulation = GateSimulation(flight_schedule(rng, args.flights, args.gap, sizes), num_staff=args.staff,
+                                seed=args.seed)
+    report = simulation.run()
+    print(f"{report['flights']} flights, {report['passengers']} passengers over {report['sim_ticks']:.0f} ticks "
+          f"({report['flights_per_1000_ticks']:.1f} flights per 1000 ticks) in {report['wall_s']:.1f}s "
+          f"({report['flights_per_s']:.0f} flights/s)")
+    print(f"Peak open flights {report['peak_open_flights']}, peak pending events {report['peak_events']}")
+    for name in ("staff_wait", "boarding_ticks", "idle_ticks", "departure_delay", "reward"):
+        stats = report[name]
+        print(f"{name:16s} mean {stats['mean']:8.1f}  std {stats['std']:8.1f}  max {stats['max']:8.1f}")
@@ -1,15 +1,17 @@
 import gymnasium as gym
 from gymnasium import spaces
-from gymnasium.envs.registration import register
+from gymnasium.envs.registration import register, registry
 from enum import Enum
 import numpy as np
+from terminal_renderer import TerminalRenderer
 
 # Register this module as a gym environment. Once registered, the id is usable in gym.make().
-# When running this code, you can ignore this warning: "UserWarning: WARN: Overriding environment airplane-boarding-v0 already in registry."
-register(
-    id='airplane-boarding-v0',
-    entry_point='main:AirplaneEnv', # module_name:class_name
-)
+# It has its own id so it does not replace airplane_boarding.AirplaneEnv under 'airplane-boarding-v0'.
+if 'airplane-boarding-main-v0' not in registry:
+    register(
+        id='airplane-boarding-main-v0',
+        entry_point='main:AirplaneEnv', # module_name:class_name
+    )
 
 class PassengerStatus(Enum):
     MOVING  = 0
@@ -50,23 +52,23 @@ class Lobby:
         self.num_of_rows = num_of_rows
         self.seats_per_row = seats_per_row
         self.lobby_rows = [LobbyRow(row_num, self.seats_per_row) for row_num in range(self.num_of_rows)]
+        self.num_passengers = num_of_rows * seats_per_row
 
     def remove_passenger(self, row_num):
         passenger = self.lobby_rows[row_num].passengers.pop()
+        self.num_passengers -= 1
         return passenger
 
     def count_passengers(self):
-        count = 0
-        for row in self.lobby_rows:
-            count += len(row.passengers)
-
-        return count
+        return self.num_passengers
 
 class BoardingLine:
     def __init__(self, num_of_rows):
         # Initialize the aisle
         self.num_of_rows = num_of_rows
         self.line = [None for i in range(num_of_rows)]
+        # Set by move_forward, the only place passengers become STALLED, so counting them is O(1)
+        self.num_stalled = 0
 
     def add_passenger(self, passenger):
         self.line.append(passenger)
@@ -78,12 +80,7 @@ class BoardingLine:
         return False
 
     def num_passengers_stalled(self):
-        count = 0
-        for passenger in self.line:
-            if passenger is not None and passenger.status == PassengerStatus.STALLED:
-                count += 1
-
-        return count
+        return self.num_stalled
 
     def num_passengers_moving(self):
         count = 0
@@ -95,6 +92,7 @@ class BoardingLine:
 
     def move_forward(self):
 
+        self.num_stalled = 0
         for i, passenger in enumerate(self.line):
             # Skip, if no passenger in that spot or
             #   passenger is at the front of the line or
@@ -109,6 +107,7 @@ class BoardingLine:
                 self.line[i] = None
             else:
                 passenger.status = PassengerStatus.STALLED
+                self.num_stalled += 1
 
         # Truncate the empty spots at the end of the line
         for i in range(len(self.line)-1, self.num_of_rows-1, -1):
@@ -163,13 +162,14 @@ class AirplaneRow:
 class AirplaneEnv(gym.Env):
     metadata = {'render_modes': ['human','terminal'], 'render_fps': 1}
 
-    def __init__(self, render_mode=None, num_of_rows=3, seats_per_row=5):
+    def __init__(self, render_mode=None, num_of_rows=3, seats_per_row=5, render_every=1, ansi_redraw=False):
 
         self.seats_per_row = seats_per_row
         self.num_of_rows = num_of_rows
         self.num_of_seats = num_of_rows * seats_per_row
 
         self.render_mode = render_mode
+        self.terminal = TerminalRenderer(render_every, ansi_redraw)
 
         # Define the Action space.
         self.action_space = spaces.Discrete(self.num_of_rows)
@@ -193,6 +193,9 @@ class AirplaneEnv(gym.Env):
         self.boarding_line = BoardingLine(self.num_of_rows)
         #for new feature of step
         self.current_step = 0
+        # Kept up to date in _move, so rendering does not have to count the seats
+        self.num_seated = 0
+        self.terminal.reset()
 
         self.render()
 
@@ -255,12 +258,7 @@ class AirplaneEnv(gym.Env):
         return False
     
     def count_passengers_seated(self):
-        count = 0
-        for row in self.airplane_rows:
-            for seat in row.seats:
-                if seat.passenger is not None and seat.passenger.status == PassengerStatus.SEATED:
-                    count+=1
-        return count
+        return self.num_seated
     
     def _move(self):
 
@@ -275,6 +273,7 @@ class AirplaneEnv(gym.Env):
             # Try to sit passenger, if successful, remove from line
             if self.airplane_rows[row_num].try_sit_passenger(passenger):
                 self.boarding_line.line[row_num] = None
+                self.num_seated += 1
 
         # Move line forward
         self.boarding_line.move_forward()
@@ -289,42 +288,40 @@ class AirplaneEnv(gym.Env):
             self._render_terminal()
 
     def _render_terminal(self):
-        print("Seats".center(19) + " | Aisle Line")
-        for row in self.airplane_rows:
-            for seat in row.seats:
-                print(seat, end=" ")
+        onboarding = self.is_onboarding()
+        # Build the frame only for ticks that are drawn, and always draw the last one
+        if not self.terminal.tick(force=not onboarding):
+            return
 
+        lines = ["Seats".center(19) + " | Aisle Line"]
+        for row in self.airplane_rows:
+            line = "".join(f"{seat} " for seat in row.seats)
             if row.row_num < len(self.boarding_line.line):
                 passenger = self.boarding_line.line[row.row_num]
-
                 status = "" if passenger is None else passenger.status
+                line += f"| {passenger} {status} "
+            lines.append(line)
 
-                print(f"| {passenger} {status}", end=" ")
-
-            print()
-
-        print("\nLine entering plane:")
+        lines += ["", "Line entering plane:"]
         for i in range(self.num_of_rows, len(self.boarding_line.line)):
             passenger = self.boarding_line.line[i]
-            print(f"{passenger} {passenger.status}")
+            lines.append(f"{passenger} {passenger.status}")
 
-        print("\nLobby:")
+        lines += ["", "Lobby:"]
         for row in self.lobby.lobby_rows:
-            for passenger in row.passengers:
-                print(passenger, end=" ")
-
-            if(len(row.passengers) > 0):
-                print()
+            if len(row.passengers) > 0:
+                lines.append("".join(f"{passenger} " for passenger in row.passengers))
 
-        print("\nDebugging Metrics:")
-        print(f"Step: {getattr(self, 'current_step', 0)}")
-        print(f"Passengers stalled: {self.boarding_line.num_passengers_stalled()}")
-        print(f"Passengers seated: {self.count_passengers_seated()}")
-        print(f"Passengers in lobby: {self.lobby.count_passengers()}")
-        if not self.is_onboarding():
-            print(f"Total boarding time: {getattr(self, 'current_step', 0)}")
+        lines += ["", "Debugging Metrics:"]
+        lines.append(f"Step: {getattr(self, 'current_step', 0)}")
+        lines.append(f"Passengers stalled: {self.boarding_line.num_passengers_stalled()}")
+        lines.append(f"Passengers seated: {self.count_passengers_seated()}")
+        lines.append(f"Passengers in lobby: {self.lobby.count_passengers()}")
+        if not onboarding:
+            lines.append(f"Total boarding time: {getattr(self, 'current_step', 0)}")
+        lines += ["", ""]
 
-        print("\n")
+        self.terminal.draw(lines)
 
 
     # This method is used to mask the actions that are allowed
@@ -343,13 +340,13 @@ class AirplaneEnv(gym.Env):
 # Check validity of the environment
 def my_check_env():
     from gymnasium.utils.env_checker import check_env
-    env = gym.make('airplane-boarding-v0', render_mode=None)
+    env = gym.make('airplane-boarding-main-v0', render_mode=None)
     check_env(env.unwrapped)
 
 if __name__ == "__main__":
     # my_check_env()
 
-    env = gym.make('airplane-boarding-v0', num_of_rows=3, seats_per_row=5, render_mode='terminal')
+    env = gym.make('airplane-boarding-main-v0', num_of_rows=3, seats_per_row=5, render_mode='terminal')
 
     observation, _ = env.reset()
     terminated = False
@@ -1,15 +1,16 @@
 import gymnasium as gym
 from gymnasium import spaces
-from gymnasium.envs.registration import register
+from gymnasium.envs.registration import register, registry
 from enum import Enum
 import numpy as np
 
 # Register this module as a gym environment. Once registered, the id is usable in gym.make().
-# When running this code, you can ignore this warning: "UserWarning: WARN: Overriding environment airplane-boarding-v0 already in registry."
-register(
-    id='airplane-boarding-v0',
-    entry_point='new:AirplaneEnv', # module_name:class_name
-)
+# It has its own id so it does not replace airplane_boarding.AirplaneEnv under 'airplane-boarding-v0'.
+if 'airplane-boarding-new-v0' not in registry:
+    register(
+        id='airplane-boarding-new-v0',
+        entry_point='new:AirplaneEnv', # module_name:class_name
+    )
 
 class PassengerStatus(Enum):
     MOVING  = 0
@@ -324,13 +325,13 @@ class AirplaneEnv(gym.Env):
 # Check validity of the environment
 def my_check_env():
     from gymnasium.utils.env_checker import check_env
-    env = gym.make('airplane-boarding-v0', render_mode=None)
+    env = gym.make('airplane-boarding-new-v0', render_mode=None)
     check_env(env.unwrapped)
 
 if __name__ == "__main__":
     # my_check_env()
 
-    env = gym.make('airplane-boarding-v0', num_of_rows=10, seats_per_row=5, render_mode='terminal')
+    env = gym.make('airplane-boarding-new-v0', num_of_rows=10, seats_per_row=5, render_mode='terminal')
 
     observation, _ = env.reset()
     terminated = False
@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+_ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0),
+    "Identity": lambda x: x,
+}
+
+
+def export_policy(model_path, out_path):
+    """Dump the actor MLP of a saved MaskablePPO model to a .npz file.
+
+    Only the layers needed to pick an action are exported: the policy branch of the
+    mlp_extractor and the action_net. This is the only function here that needs torch.
+    """
+    from sb3_contrib import MaskablePPO
+    from torch import nn
+
+    model = MaskablePPO.load(model_path, device="cpu")
+    policy = model.policy
+    if type(policy.features_extractor).__name__ != "FlattenExtractor":
+        raise ValueError(f"Unsupported features extractor {type(policy.features_extractor).__name__}")
+
+    arrays, activations = {}, []
+    layer = 0
+    for module in policy.mlp_extractor.policy_net:
+        if isinstance(module, nn.Linear):
+            arrays[f"w{layer}"] = module.weight.detach().numpy().T.astype(np.float32)
+            arrays[f"b{layer}"] = module.bias.detach().numpy().astype(np.float32)
+            layer += 1
+        else:
+            name = type(module).__name__
+            if name not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation {name}")
+            activations.append(name)
+    if len(activations) != layer:
+        raise ValueError("Expected one activation after each hidden layer")
+
+    arrays["action_w"] = policy.action_net.weight.detach().numpy().T.astype(np.float32)
+    arrays["action_b"] = policy.action_net.bias.detach().numpy().astype(np.float32)
+    arrays["activations"] = np.array(activations)
+    np.savez(out_path, **arrays)
+
+
+class NumpyPolicy:
+    """Masked forward pass of an exported MaskablePPO policy using only NumPy.
+
+    `predict` mirrors `MaskablePPO.predict`: it accepts a single observation or a batch,
+    optional action masks, and returns `(actions, None)`.
+    """
+
+    def __init__(self, weights, biases, activations, action_w, action_b, seed=None):
+        self.weights = weights
+        self.biases = biases
+        self.activations = [_ACTIVATIONS[name] for name in activations]
+        self.action_w = action_w
+        self.action_b = action_b
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path, seed=None):
+        with np.load(path) as data:
+            activations = [str(name) for name in data["activations"]]
+            weights = [data[f"w{i}"] for i in range(len(activations))]
+            biases = [data[f"b{i}"] for i in range(len(activations))]
+            return cls(weights, biases, activations, data["action_w"], data["action_b"], seed=seed)
+
+    def logits(self, observation, action_masks=None):
+        x = np.asarray(observation, dtype=np.float32)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            x = activation(x @ w + b)
+        logits = x @ self.action_w + self.action_b
+        if action_masks is not None:
+            # Same masking value sb3-contrib uses for invalid actions
+            logits = np.where(np.asarray(action_masks, dtype=bool), logits, np.float32(-1e8))
+        return logits
+
+    def predict(self, observation, action_masks=None, deterministic=True):
+        observation = np.asarray(observation)
+        single = observation.ndim == 1
+        if single:
+            observation = observation[None]
+            if action_masks is not None:
+                action_masks = np.asarray(action_masks)[None]
+
+        logits = self.logits(observation, action_masks)
+        # Normalise in float32 like torch's Categorical, so near-ties round the same way
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        logits = shifted - np.log(np.exp(shifted).sum(axis=1, keepdims=True))
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        if deterministic:
+            actions = probs.argmax(axis=1)
+        else:
+            u = self.rng.random((len(probs), 1))
+            actions = np.minimum((probs.cumsum(axis=1) < u).sum(axis=1), probs.shape[1] - 1)
+
+        return (actions[0] if single else actions), None
+
+
+def check_policy(model_path, npz_path, rows=10, seats=5, episodes=20):
+    """Compare deterministic actions of the exported policy with MaskablePPO.predict.
+
+    Returns the number of mismatching decisions and the mean NumPy latency per decision.
+    """
+    from sb3_contrib import MaskablePPO
+    from boarding_strategies import make_env
+
+    model = MaskablePPO.load(model_path, device="cpu")
+    policy = NumpyPolicy.load(npz_path)
+    rng = np.random.default_rng(0)
+    env = make_env(rows=rows, seats=seats)
+    mismatches, decisions, elapsed = 0, 0, 0.0
+
+    for _ in range(episodes):
+        obs, _ = env.reset()
+        terminated = False
+        while not terminated:
+            masks = np.array(env.unwrapped.action_masks())
+            start = time.perf_counter()
+            action, _ = policy.predict(obs, action_masks=masks)
+            elapsed += time.perf_counter() - start
+            expected, _ = model.predict(obs, action_masks=masks, deterministic=True)
+            mismatches += int(action != expected)
+            decisions += 1
+            # Walk random valid rows so the comparison covers more than one trajectory
+            obs, _, terminated, _, _ = env.step(int(rng.choice(np.flatnonzero(masks))))
+    env.close()
+    return mismatches, elapsed / decisions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a MaskablePPO policy for torch-free inference")
+    parser.add_argument("model", nargs="?", default="best_model", help="Model name under models/MaskablePPO")
+    parser.add_argument("--out", help="Output .npz path (default: next to the model)")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5)
+    args = parser.parse_args()
+
+    model_path = os.path.join("models", "MaskablePPO", args.model)
+    out_path = args.out or f"{model_path}.npz"
+    export_policy(model_path, out_path)
+    mismatches, latency = check_policy(model_path, out_path, rows=args.rows, seats=args.seats)
+    print(f"Exported to {out_path}: {mismatches} mismatching actions, {latency * 1e6:.1f} us per decision")
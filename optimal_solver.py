@@ -0,0 +1,304 @@
+import argparse
+import sys
+import time
+from functools import lru_cache
+
+from airplane_boarding import AirplaneEnv
+from boarding_strategies import make_env, random_strategy, back_to_front, front_to_back, wilma
+
+
+@lru_cache(maxsize=None)
+def _queue_gain(remaining, queue, old, run, free_blocks, num_of_rows):
+    """Upper bound on what the door queue adds to the reward of the remaining passengers.
+
+    Relaxes the cabin to a choice per tick of whether the queue head enters the aisle. A
+    passenger joining behind `queue` others earns up to `queue` extra moves. A tick in which the
+    head waits stalls everyone queued (-1 for each of the `old` passengers queued before the state
+    is already counted), plus whoever blocks the last aisle slot, unless that is a door-row
+    passenger stowing or a passenger already in line (`free_blocks`). Consecutive entries have to
+    go to strictly later rows or stall the aisle back to the door, so the head waits at least
+    once every num_of_rows ticks.
+    """
+    if remaining == 0:
+        return 0
+    best = (-(queue + 1 - old) - (0 if free_blocks else 1)
+            + _queue_gain(remaining - 1, queue + 1, old, 0, max(free_blocks - 1, 0), num_of_rows))
+    if run < num_of_rows:
+        best = max(best, _queue_gain(remaining - 1, queue, max(old - 1, 0), run + 1, free_blocks, num_of_rows))
+    return queue + best
+
+
+class OptimalSolver:
+    """Exact reward-optimal and time-optimal boarding orders for small cabins.
+
+    Both searches run over a canonical state instead of the AirplaneEnv objects. Nobody
+    overtakes in the aisle, so once passenger k is appended its whole path is fixed by the
+    passengers ahead: it enters slot s-1 one tick after reaching slot s, but not before the
+    previous passenger through s-1 has left it, then stows for one tick and sits down on the
+    next. The state before appending passenger k is therefore
+
+    * per aisle/queue slot: (ticks until the latest passenger through it arrives there,
+      ticks until it leaves), both relative to k and clamped at 0, and
+    * the number of passengers left in each lobby row.
+
+    This drops everything the future does not depend on: seat numbers (passengers of a row
+    are interchangeable), statuses and absolute time. Reward is added when a passenger's path
+    is fixed (+1 per move, -1 per tick spent waiting) and boarding time is read off the last
+    departure at the end.
+
+    Reward: depth-first branch and bound, memoized on the state. reward_bound() is an
+    admissible bound on the reward still to come; subtrees that cannot beat the best order
+    found so far are cut, and their bound is memoized so later visits with a lower bar can
+    reuse or refine it. Children are searched best bound first, from a greedy order's reward.
+
+    Time: breadth-first over the passengers boarded, with dominance pruning. All states of a
+    layer are at the same tick, and a state whose arrival and departure times are pointwise no
+    later than another's, with the same lobby, finishes no later under any continuation (the
+    path updates are max-plus and monotone), so the later one is dropped. The reported order
+    is time-optimal; its reward is not maximised among the time-optimal orders.
+
+    solve() replays both optimal orders through AirplaneEnv and checks reward and boarding
+    time, so any drift from the simulator's rules fails loudly.
+    """
+
+    def __init__(self, num_of_rows=3, seats_per_row=5):
+        self.num_of_rows = num_of_rows
+        self.seats_per_row = seats_per_row
+        self.memo = {}
+        self.states_explored = self.cache_hits = self.pruned = 0
+        self.time_states = self.dominated = 0
+
+    def _step(self, profile, row_num):
+        """Append a passenger for row_num, return (reward, next profile shifted by one tick)"""
+        profile = list(profile)
+        # New passengers join one slot behind the last passenger still in line
+        tail = max((slot for slot, (arrive, leave) in enumerate(profile) if arrive == 0 and leave > 0), default=-1)
+        entry = max(self.num_of_rows, tail + 1)
+        profile += [(0, 0)] * (entry + 1 - len(profile))
+
+        profile[entry] = (0, profile[entry][1])
+        tick = 0
+        for slot in range(entry, row_num, -1):
+            tick = max(tick + 1, profile[slot - 1][1])
+            profile[slot] = (profile[slot][0], tick)
+            profile[slot - 1] = (tick, profile[slot - 1][1])
+        profile[row_num] = (profile[row_num][0], tick + 2)
+
+        moves = entry - row_num
+        reward = moves - (tick - moves)
+        profile = [(max(arrive - 1, 0), leave - 1) if leave > 1 else (0, 0) for arrive, leave in profile]
+        while profile and profile[-1] == (0, 0):
+            profile.pop()
+        return reward, tuple(profile)
+
+    def _successors(self, state):
+        """Next states by row; rows that lead to the same state keep the best immediate reward"""
+        profile, lobby_counts = state
+        best = {}
+        for row_num, count in enumerate(lobby_counts):
+            if count == 0:
+                continue
+            reward, next_profile = self._step(profile, row_num)
+            next_state = (next_profile, lobby_counts[:row_num] + (count - 1,) + lobby_counts[row_num + 1:])
+            if next_state in best and best[next_state][0] >= reward:
+                continue
+            best[next_state] = (reward, row_num)
+        return best
+
+    def reward_bound(self, state):
+        """Admissible upper bound on the reward of boarding the rest of the lobby from state.
+
+        A passenger of row r earns at most its moves, num_of_rows - r in the aisle plus the
+        length of the door queue it joins; _queue_gain bounds the latter net of the stalls
+        that building the queue costs.
+        """
+        profile, lobby_counts = state
+        num_of_rows = self.num_of_rows
+        tail = max((slot for slot, (arrive, leave) in enumerate(profile) if arrive == 0 and leave > 0), default=-1)
+        queue = max(tail + 1 - num_of_rows, 0)
+        # Ticks until the passengers already in line have cleared the door slot
+        door_busy = profile[num_of_rows - 1][1] if len(profile) >= num_of_rows else 0
+        aisle_moves = sum(count * (num_of_rows - row_num) for row_num, count in enumerate(lobby_counts))
+        return aisle_moves + _queue_gain(sum(lobby_counts), queue, queue, 0, lobby_counts[-1] + door_busy, num_of_rows)
+
+    def _greedy_reward(self, state):
+        """Reward of boarding the rest by best immediate reward plus bound, a lower bound on the optimum"""
+        total = 0
+        while sum(state[1]) > 0:
+            _, reward, next_state = max((reward + self.reward_bound(next_state), reward, next_state)
+                                        for next_state, (reward, _) in self._successors(state).items())
+            total += reward
+            state = next_state
+        return total
+
+    def _search(self, state, alpha):
+        """Best reward from state to the end if it is above alpha (exact), otherwise an upper bound <= alpha"""
+        entry = self.memo.get(state)
+        if entry is not None and (entry[1] or entry[0] <= alpha):
+            self.cache_hits += 1
+            return entry[0]
+        self.states_explored += 1
+
+        if sum(state[1]) == 0:
+            self.memo[state] = (0, True, None)
+            return 0
+        children = sorted(((reward + self.reward_bound(next_state), reward, row_num, next_state)
+                           for next_state, (reward, row_num) in self._successors(state).items()), reverse=True)
+        best = action = bound = None
+        for i, (child_bound, reward, row_num, next_state) in enumerate(children):
+            floor = alpha if best is None else max(alpha, best)
+            if child_bound <= floor:
+                # Children are sorted by bound, so none of the rest can beat the floor either
+                self.pruned += len(children) - i
+                bound = child_bound if bound is None else max(bound, child_bound)
+                break
+            value = reward + self._search(next_state, floor - reward)
+            if value > floor:
+                best, action = value, row_num
+            else:
+                bound = value if bound is None else max(bound, value)
+
+        if best is not None:
+            self.memo[state] = (best, True, action)
+            return best
+        self.memo[state] = (bound, False, None)
+        return bound
+
+    def _solve_reward(self, state):
+        entry = self.memo.get(state)
+        if entry is None or not entry[1]:
+            self._search(state, self._greedy_reward(state) - 1)
+        return self.memo[state]
+
+    def _solve_time(self, state):
+        """Fewest ticks to board everyone from state, and the rows that achieve it"""
+        layers = []
+        layer = {state: None}
+        for _ in range(sum(state[1])):
+            successors = {}
+            for current in layer:
+                for next_state, (_, row_num) in self._successors(current).items():
+                    successors.setdefault(next_state, (current, row_num))
+            layer = {next_state: successors[next_state] for next_state in self._undominated(successors)}
+            layers.append(layer)
+
+        # Ticks still needed after the last passenger joined the line
+        best = min(layer, key=lambda final: max((leave for _, leave in final[0]), default=0))
+        ticks = max((leave for _, leave in best[0]), default=0)
+        actions = []
+        for layer in reversed(layers):
+            best, row_num = layer[best]
+            actions.append(row_num)
+        return ticks, actions[::-1]
+
+    def _undominated(self, states):
+        """States that no other state with the same lobby dominates (pointwise earlier or equal times)"""
+        groups = {}
+        for state in states:
+            groups.setdefault(state[1], []).append(state)
+        kept = []
+        for group in groups.values():
+            width = max(len(profile) for profile, _ in group)
+            flat = sorted((sum(times), times, state) for state in group
+                          for times in [tuple(t for slot in state[0] for t in slot) + (0,) * 2 * (width - len(state[0]))])
+            front = []
+            for _, times, state in flat:
+                if any(all(a <= b for a, b in zip(other, times)) for other in front):
+                    self.dominated += 1
+                    continue
+                front.append(times)
+                kept.append(state)
+        self.time_states += len(kept)
+        return kept
+
+    def solve(self, objectives=("reward", "time")):
+        """Solve from the initial cabin and return a dict with the optimal orders and search statistics"""
+        num_of_seats = self.num_of_rows * self.seats_per_row
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * num_of_seats + 100))
+        initial = self.initial_state()
+        env = AirplaneEnv(num_of_rows=self.num_of_rows, seats_per_row=self.seats_per_row)
+        result = {}
+
+        if "reward" in objectives:
+            start = time.perf_counter()
+            reward, _, _ = self._solve_reward(initial)
+            actions = self._actions(initial)
+            reward_replayed, boarding_time = run_actions(env, actions)
+            assert reward_replayed == reward, "reward-optimal order does not replay to the same reward in AirplaneEnv"
+            result["reward_optimal"] = {"reward": reward, "boarding_time": boarding_time, "actions": actions}
+            result.update(states_explored=self.states_explored, memo_size=len(self.memo),
+                          cache_hits=self.cache_hits, pruned=self.pruned, reward_runtime=time.perf_counter() - start)
+
+        if "time" in objectives:
+            start = time.perf_counter()
+            ticks, actions = self._solve_time(initial)
+            reward, boarding_time = run_actions(env, actions)
+            assert boarding_time == num_of_seats + ticks, \
+                "time-optimal order does not replay to the same boarding time in AirplaneEnv"
+            result["time_optimal"] = {"reward": reward, "boarding_time": boarding_time, "actions": actions}
+            result.update(time_states=self.time_states, dominated=self.dominated,
+                          time_runtime=time.perf_counter() - start)
+        return result
+
+    def _actions(self, state):
+        actions = []
+        while sum(state[1]) > 0:
+            row_num = self.best_action(state)
+            actions.append(row_num)
+            state = self.next_state(state, row_num)
+        return actions
+
+    def initial_state(self):
+        return (), (self.seats_per_row,) * self.num_of_rows
+
+    def next_state(self, state, row_num):
+        """Canonical state after boarding a passenger of row_num, for following any order alongside the env"""
+        profile, lobby_counts = state
+        _, next_profile = self._step(profile, row_num)
+        return next_profile, lobby_counts[:row_num] + (lobby_counts[row_num] - 1,) + lobby_counts[row_num + 1:]
+
+    def best_action(self, state, objective=0):
+        """Optimal next row from a canonical state; objective 0 maximises reward, 1 minimises boarding time"""
+        if objective == 1:
+            return self._solve_time(state)[1][0]
+        return self._solve_reward(state)[2]
+
+
+def run_actions(env, actions):
+    """Replay a row sequence on a fresh env and return (total reward, boarding time)"""
+    env.reset()
+    total_reward = 0
+    for row_num in actions:
+        reward, _ = env.unwrapped.step_fast(row_num)
+        total_reward += reward
+    return total_reward, env.unwrapped.boarding_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact optimal boarding orders for small cabins")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--objective", choices=("both", "reward", "time"), default="both")
+    args = parser.parse_args()
+
+    objectives = ("reward", "time") if args.objective == "both" else (args.objective,)
+    result = OptimalSolver(args.rows, args.seats).solve(objectives)
+    if "reward" in objectives:
+        print(f"Reward search on {args.rows}x{args.seats} took {result['reward_runtime']:.2f}s: "
+              f"{result['states_explored']} states explored, memo size {result['memo_size']}, "
+              f"{result['cache_hits']} cache hits, {result['pruned']} successors pruned by the bound")
+    if "time" in objectives:
+        print(f"Time search on {args.rows}x{args.seats} took {result['time_runtime']:.2f}s: "
+              f"{result['time_states']} states kept, {result['dominated']} dominated")
+    for objective in ("reward_optimal", "time_optimal"):
+        if objective in result:
+            best = result[objective]
+            print(f"{objective:15s} -> Time: {best['boarding_time']}, Reward: {best['reward']}, "
+                  f"Actions: {best['actions']}")
+
+    env = make_env(rows=args.rows, seats=args.seats)
+    for name, strategy in [("Back-to-Front", back_to_front), ("Front-to-Back", front_to_back), ("WilMA", wilma),
+                           ("Random", random_strategy)]:
+        _, reward = strategy(env)
+        print(f"{name:15s} -> Time: {env.unwrapped.boarding_time}, Reward: {reward}")
+    env.close()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+
+table_dir = os.path.join("models", "PolicyTable")
+
+
+class PolicyTable:
+    """Next-row lookup table keyed on a reduced cabin state, served without any inference.
+
+    The key packs, in mixed radix, the passengers left in each lobby row (0..seats_per_row)
+    and one code per aisle slot (0 empty, 1 + PassengerStatus value for MOVING, STALLED and
+    STOWING). Seat numbers and the queue outside the door are left out. Each entry is stored
+    as key * num_of_rows + action in one sorted uint64 array, so a lookup is a binary search
+    over a file that can be memory-mapped. Unknown keys fall back to the back-most valid row.
+    """
+
+    def __init__(self, entries, num_of_rows, seats_per_row):
+        if (seats_per_row + 1) ** num_of_rows * 4 ** num_of_rows * num_of_rows >= 2 ** 64:
+            raise ValueError(f"A {num_of_rows}x{seats_per_row} cabin does not fit a 64-bit table key")
+        # A plain ndarray view of the memmap searches several times faster than the memmap itself
+        self.entries = np.asarray(entries)
+        self.num_of_rows = num_of_rows
+        self.seats_per_row = seats_per_row
+        self.misses = 0
+
+    @classmethod
+    def from_actions(cls, actions_by_key, num_of_rows, seats_per_row):
+        entries = np.array(sorted(key * num_of_rows + action for key, action in actions_by_key.items()), dtype=np.uint64)
+        return cls(entries, num_of_rows, seats_per_row)
+
+    @classmethod
+    def load(cls, path):
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        entries = np.load(f"{path}.npy", mmap_mode="r")
+        return cls(entries, meta["num_of_rows"], meta["seats_per_row"])
+
+    def save(self, path, **meta):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(f"{path}.npy", np.asarray(self.entries, dtype=np.uint64))
+        with open(f"{path}.json", "w") as f:
+            json.dump({"num_of_rows": self.num_of_rows, "seats_per_row": self.seats_per_row,
+                       "entries": len(self.entries), **meta}, f, indent=2)
+
+    @property
+    def nbytes(self):
+        return self.entries.nbytes
+
+    def key(self, env):
+        key = 0
+        for row in env.lobby.lobby_rows:
+            key = key * (self.seats_per_row + 1) + len(row.passengers)
+        for passenger in env.boarding_line.aisle:
+            key = key * 4 + (0 if passenger is None else 1 + passenger.status.value)
+        return key
+
+    def lookup(self, env):
+        """Return the table's row for the current state of an AirplaneEnv"""
+        first = self.key(env) * self.num_of_rows
+        i = int(np.searchsorted(self.entries, np.uint64(first)))
+        if i < len(self.entries) and int(self.entries[i]) < first + self.num_of_rows:
+            return int(self.entries[i]) - first
+        self.misses += 1
+        return max(row for row, valid in enumerate(env.action_masks()) if valid)
+
+
+def policy_source(path):
+    """Source that follows a saved MaskablePPO model, or its .npz export (no torch needed)"""
+    if path.endswith(".npz"):
+        from numpy_policy import NumpyPolicy
+        policy = NumpyPolicy.load(path)
+    else:
+        from sb3_contrib import MaskablePPO
+        policy = MaskablePPO.load(path, device="cpu")
+
+    def source(env):
+        action, _ = policy.predict(env._get_observation(), action_masks=np.array(env.action_masks()),
+                                   deterministic=True)
+        return int(action)
+    return source
+
+
+class RolloutPlanner:
+    """Search-based source: try every valid row, finish the boarding back-to-front from
+    there and keep the row with the best total reward. Results are memoized on the full state."""
+
+    def __init__(self, num_of_rows, seats_per_row):
+        self.scratch = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+        self.scratch.reset()
+        self.memo = {}
+
+    def __call__(self, env):
+        state = env.get_state()
+        if state not in self.memo:
+            best = None
+            for row_num in reversed(range(env.num_of_rows)):
+                if env.lobby.lobby_rows[row_num].passengers:
+                    reward = self._rollout(state, row_num)
+                    if best is None or reward > best[0]:
+                        best = (reward, row_num)
+            self.memo[state] = best[1]
+        return self.memo[state]
+
+    def _rollout(self, state, row_num):
+        sim = self.scratch
+        sim.set_state(state)
+        total_reward, terminated = sim.step_fast(row_num)
+        for row in reversed(range(sim.num_of_rows)):
+            while not terminated and sim.lobby.lobby_rows[row].passengers:
+                reward, terminated = sim.step_fast(row)
+                total_reward += reward
+        return total_reward
+
+
+def _explore_episode(env, choose, rng, explore):
+    """Run one episode; `choose` picks each row, replaced by a random valid row with probability explore"""
+    env.reset()
+    while not env.terminated:
+        action = choose(env)
+        if rng.random() < explore:
+            action = int(rng.choice(np.flatnonzero(env.action_masks())))
+        env.step_fast(action)
+
+
+def distil(source, num_of_rows=10, seats_per_row=5, episodes=1000, explore=0.2, seed=0):
+    """Build a PolicyTable from the states visited by `source` (a callable env -> row).
+
+    With probability `explore` a random valid row is taken instead of the source's choice, so
+    the table also covers states the deterministic source would never reach itself. When one
+    reduced key stands for several full states, the most frequent source action wins.
+    """
+    env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    table = PolicyTable(np.zeros(0, dtype=np.uint64), num_of_rows, seats_per_row)
+    rng = np.random.default_rng(seed)
+    votes = {}
+
+    def choose(env):
+        action = source(env)
+        votes.setdefault(table.key(env), np.zeros(num_of_rows, dtype=np.int64))[action] += 1
+        return action
+
+    for _ in range(episodes):
+        _explore_episode(env, choose, rng, explore)
+    return PolicyTable.from_actions({key: int(counts.argmax()) for key, counts in votes.items()},
+                                    num_of_rows, seats_per_row)
+
+
+def compare(table, source, episodes=200, explore=0.2, seed=1):
+    """Agreement of the table with its source on fresh exploratory episodes.
+
+    Returns agreement rate, coverage (share of states whose key is in the table), mean lookup
+    latency and the total reward of one episode driven by the table and one by the source.
+    """
+    env = AirplaneEnv(num_of_rows=table.num_of_rows, seats_per_row=table.seats_per_row)
+    rng = np.random.default_rng(seed)
+    agree = decisions = 0
+    elapsed = 0.0
+    misses_before = table.misses
+
+    def choose(env):
+        nonlocal agree, decisions, elapsed
+        start = time.perf_counter()
+        action = table.lookup(env)
+        elapsed += time.perf_counter() - start
+        expected = source(env)
+        agree += action == expected
+        decisions += 1
+        return expected
+
+    for _ in range(episodes):
+        _explore_episode(env, choose, rng, explore)
+
+    return {
+        "agreement": agree / decisions,
+        "coverage": 1 - (table.misses - misses_before) / decisions,
+        "lookup_us": elapsed / decisions * 1e6,
+        "table_reward": _episode_reward(env, table.lookup),
+        "source_reward": _episode_reward(env, source),
+    }
+
+
+def _episode_reward(env, choose):
+    env.reset()
+    total_reward = 0
+    while not env.terminated:
+        reward, _ = env.step_fast(choose(env))
+        total_reward += reward
+    return total_reward
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil a policy or planner into a next-row lookup table")
+    parser.add_argument("--source", default="planner",
+                        help="'planner', or a model name / .npz export under models/MaskablePPO")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--seats", type=int, default=3)
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--explore", type=float, default=0.2)
+    parser.add_argument("--out", help="Output path without extension (default: models/PolicyTable/<source>_<rows>x<seats>)")
+    args = parser.parse_args()
+
+    if args.source == "planner":
+        source = RolloutPlanner(args.rows, args.seats)
+    else:
+        source = policy_source(os.path.join("models", "MaskablePPO", args.source))
+    name = os.path.splitext(os.path.basename(args.source))[0]
+    out = args.out or os.path.join(table_dir, f"{name}_{args.rows}x{args.seats}")
+
+    start = time.perf_counter()
+    table = distil(source, args.rows, args.seats, episodes=args.episodes, explore=args.explore)
+    build_time = time.perf_counter() - start
+    table.save(out, source=args.source, episodes=args.episodes, explore=args.explore)
+
+    result = compare(PolicyTable.load(out), source, explore=args.explore)
+    print(f"Saved {len(table.entries)} entries ({table.nbytes / 1024:.1f} kB) to {out}.npy in {build_time:.1f}s")
+    print(f"Agreement {result['agreement']:.1%}, coverage {result['coverage']:.1%}, "
+          f"lookup {result['lookup_us']:.1f} us")
+    print(f"Total reward: table {result['table_reward']}, source {result['source_reward']}")
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Render without a display; must be set before pygame opens one
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from airplane_boarding import AirplaneEnv
+
+video_dir = "videos"
+
+
+class FrameRecorder(AirplaneEnv):
+    """AirplaneEnv in human render mode that captures frames instead of showing them.
+
+    Drawing is AirplaneEnv._render_human; the frame rate limit is lifted and each tick's
+    screen is handed to `on_frame(tick, surface)`. Only ticks in [start, end) are drawn, so a
+    worker can simulate up to its chunk without paying for the frames before it.
+    """
+    metadata = {**AirplaneEnv.metadata, "render_fps": 0}
+
+    def __init__(self, num_of_rows=10, seats_per_row=5):
+        super().__init__(render_mode="human", num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+        self.start, self.end, self.on_frame = 0, None, None
+
+    @property
+    def frame_size(self):
+        return self.screen.get_size()
+
+    def _render_human(self):
+        tick = self.boarding_time - 1
+        if self.start <= tick and (self.end is None or tick < self.end):
+            super()._render_human()
+            self.on_frame(tick, self.screen)
+
+
+_recorders = {}
+
+
+def _recorder(num_of_rows, seats_per_row):
+    # One recorder per cabin size and worker process; pygame is initialised only once
+    if (num_of_rows, seats_per_row) not in _recorders:
+        _recorders[num_of_rows, seats_per_row] = FrameRecorder(num_of_rows, seats_per_row)
+    return _recorders[num_of_rows, seats_per_row]
+
+
+def episode_ticks(actions, num_of_rows, seats_per_row):
+    """Number of ticks (frames) of an episode, without rendering"""
+    env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row)
+    env.reset()
+    for row_num in actions:
+        env.step_fast(row_num)
+    if not env.terminated:
+        raise ValueError("Action sequence does not finish the boarding")
+    return env.boarding_time
+
+
+def _episode_path(out_dir, episode, fmt):
+    if fmt == "png":
+        return os.path.join(out_dir, f"episode_{episode:04d}")
+    return os.path.join(out_dir, f"episode_{episode:04d}.rgb")
+
+
+def render_chunk(job):
+    """Replay one episode and write the frames of ticks [start, end). Returns frames written."""
+    episode, actions, num_of_rows, seats_per_row, start, end, out_dir, fmt = job
+    env = _recorder(num_of_rows, seats_per_row)
+    path = _episode_path(out_dir, episode, fmt)
+    written = 0
+
+    if fmt == "png":
+        def on_frame(tick, surface):
+            nonlocal written
+            pygame.image.save(surface, os.path.join(path, f"frame_{tick:05d}.png"))
+            written += 1
+    else:
+        # Frames have a fixed size, so each chunk writes straight to its offset in the episode file
+        width, height = env.frame_size
+        frame_bytes = width * height * 3
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+
+        def on_frame(tick, surface):
+            nonlocal written
+            os.pwrite(fd, pygame.image.tobytes(surface, "RGB"), tick * frame_bytes)
+            written += 1
+
+    env.start, env.end, env.on_frame = start, end, on_frame
+    try:
+        env.reset()
+        for row_num in actions:
+            if env.boarding_time >= end:
+                break
+            env.step_fast(row_num)
+    finally:
+        env.on_frame = None
+        if fmt != "png":
+            os.close(fd)
+    return written
+
+
+def replay(episodes, num_of_rows, seats_per_row, out_dir=video_dir, fmt="png", chunk_ticks=50, workers=None):
+    """Render recorded action sequences to frames, in parallel chunks of up to chunk_ticks ticks.
+
+    fmt "png" writes <out_dir>/episode_NNNN/frame_TTTTT.png; "raw" writes one RGB24 file per
+    episode (frames back to back) with its size and frame count in a .json next to it, e.g.
+    for `ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -r 4 -i episode_0000.rgb episode_0000.mp4`.
+    Returns the total number of frames.
+    """
+    assert fmt in ("png", "raw")
+    os.makedirs(out_dir, exist_ok=True)
+    width, height = _recorder(num_of_rows, seats_per_row).frame_size
+
+    jobs = []
+    for episode, actions in enumerate(episodes):
+        actions = [int(a) for a in actions]
+        ticks = episode_ticks(actions, num_of_rows, seats_per_row)
+        path = _episode_path(out_dir, episode, fmt)
+        if fmt == "png":
+            os.makedirs(path, exist_ok=True)
+        else:
+            with open(path, "wb") as f:
+                f.truncate(ticks * width * height * 3)
+            with open(path[:-len(".rgb")] + ".json", "w") as f:
+                json.dump({"width": width, "height": height, "frames": ticks, "pix_fmt": "rgb24",
+                           "num_of_rows": num_of_rows, "seats_per_row": seats_per_row, "actions": actions}, f)
+        for start in range(0, ticks, chunk_ticks):
+            jobs.append((episode, actions, num_of_rows, seats_per_row, start, min(start + chunk_ticks, ticks),
+                         out_dir, fmt))
+
+    if workers == 1:
+        return sum(map(render_chunk, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(render_chunk, jobs))
+
+
+def load_episodes(path):
+    """Action sequences from a demonstrations.py .npz, or a JSON file holding a list of action
+    lists or {"num_of_rows", "seats_per_row", "episodes"}. Returns (episodes, rows, seats);
+    the sizes are None when the file does not store them. Demonstrations replay the rows that
+    were taken, not the expert labels.
+    """
+    if path.endswith(".npz"):
+        from demonstrations import load_dataset
+        dataset = load_dataset(path)
+        # Datasets recorded before the taken rows were stored only have the labels
+        taken = dataset.get("taken", dataset["actions"])
+        episodes = np.split(taken, dataset["episode_ends"][:-1])
+        if "num_of_rows" in dataset:
+            return episodes, int(dataset["num_of_rows"]), int(dataset["seats_per_row"])
+        return episodes, None, None
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return data["episodes"], data.get("num_of_rows"), data.get("seats_per_row")
+    return data, None, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render recorded boarding episodes to frames, headless and in parallel")
+    parser.add_argument("episodes", help="demonstrations .npz or JSON file with action sequences")
+    parser.add_argument("--rows", type=int, help="Cabin rows, if the file does not store them")
+    parser.add_argument("--seats", type=int, help="Seats per row, if the file does not store them")
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    parser.add_argument("--out", default=video_dir)
+    parser.add_argument("--chunk-ticks", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per CPU")
+    parser.add_argument("--limit", type=int, help="Only render the first N episodes")
+    args = parser.parse_args()
+
+    episodes, rows, seats = load_episodes(args.episodes)
+    rows, seats = args.rows or rows or 10, args.seats or seats or 5
+    episodes = episodes[:args.limit]
+    start = time.perf_counter()
+    frames = replay(episodes, rows, seats, out_dir=args.out, fmt=args.format, chunk_ticks=args.chunk_ticks,
+                    workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {frames} frames of {len(episodes)} episodes to {args.out} in {elapsed:.1f}s "
+          f"({frames / elapsed:.0f} frames/s)")
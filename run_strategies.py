@@ -1,6 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from boarding_strategies import make_env, random_strategy, back_to_front, front_to_back, wilma
+from boarding_strategies import env_pool, random_strategy, back_to_front, front_to_back, wilma
 
 # Strategies to compare
 strategies = {
@@ -14,9 +14,9 @@ def evaluate_strategy(strategy_func, runs=10, rows=10, seats=5):
     """Run one strategy multiple times and return avg steps + reward"""
     steps_list, reward_list = [], []
     for _ in range(runs):
-        env = make_env(rows=rows, seats=seats)
-        steps, reward = strategy_func(env)
-        env.close()
+        # Reuse a warm env of this size instead of building one per run
+        with env_pool.lease(rows=rows, seats=seats) as env:
+            steps, reward = strategy_func(env)
         steps_list.append(steps)
         reward_list.append(reward)
     return np.mean(steps_list), np.mean(reward_list)
@@ -0,0 +1,178 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from boarding_estimator import estimate_boarding_batch
+
+# A strategy is a (family, params) pair. Its family function gives every seat of a
+# (num_of_rows, seats_per_row) cabin a group number; passengers board group by group, in random
+# order within a group. Row 0 is the far end of the cabin, row num_of_rows - 1 is at the door.
+# AirplaneEnv only takes rows as actions, so a compiled strategy is the row of each passenger
+# in boarding order; which seat of a row they sit in does not change the simulation.
+
+
+def _seat_layers(seats_per_row):
+    """Per seat column: 0 for the windows, counting up towards the aisle (as in wilma)"""
+    columns = np.arange(seats_per_row)
+    return np.minimum(columns, seats_per_row - 1 - columns)
+
+
+def _row_zones(num_of_rows, zones, far_first=True):
+    """Per row: its zone out of `zones` blocks of rows, numbered in boarding order"""
+    zone = np.arange(num_of_rows) * zones // num_of_rows
+    return zone if far_first else zones - 1 - zone
+
+
+def random_groups(num_of_rows, seats_per_row):
+    """Everyone at once, in random order"""
+    return np.zeros((num_of_rows, seats_per_row), dtype=np.int64)
+
+
+def zone_groups(num_of_rows, seats_per_row, zones=3, far_first=True):
+    """Blocks of rows, one after another. zones=num_of_rows is row by row."""
+    zone = _row_zones(num_of_rows, zones, far_first)
+    return np.repeat(zone[:, None], seats_per_row, axis=1)
+
+
+def outside_in_groups(num_of_rows, seats_per_row, zones=1, far_first=True):
+    """Windows first, then middle seats, then aisle seats, each seat layer split into zones of rows.
+    zones=1 is WilMA with random order within a layer."""
+    zone = _row_zones(num_of_rows, zones, far_first)
+    return _seat_layers(seats_per_row)[None, :] * zones + zone[:, None]
+
+
+def reverse_pyramid_groups(num_of_rows, seats_per_row, zones=3):
+    """Diagonal groups from the far windows to the door aisle seats: group = zone + seat layer"""
+    zone = _row_zones(num_of_rows, zones)
+    return _seat_layers(seats_per_row)[None, :] + zone[:, None]
+
+
+def steffen_groups(num_of_rows, seats_per_row):
+    """Steffen's method: by seat layer, then side of the aisle, then every other row, each pass
+    from the far end. Every seat is its own group, so the order is fixed."""
+    columns = np.arange(seats_per_row)
+    side = (columns >= seats_per_row // 2).astype(np.int64)
+    rows = np.arange(num_of_rows)
+    passes = (_seat_layers(seats_per_row)[None, :] * 2 + side[None, :]) * 2 + rows[:, None] % 2
+    return passes * num_of_rows + rows[:, None]
+
+
+families = {
+    "random": random_groups,
+    "zones": zone_groups,
+    "outside_in": outside_in_groups,
+    "reverse_pyramid": reverse_pyramid_groups,
+    "steffen": steffen_groups,
+}
+
+
+def strategy_name(family, params):
+    return family + "".join(f" {key}={value}" for key, value in sorted(params.items()))
+
+
+def strategy_family(num_of_rows, seats_per_row, max_zones=6):
+    """The (family, params) strategies ranked by default for a cabin"""
+    zone_counts = range(2, min(max_zones, num_of_rows) + 1)
+    # Row by row (zones=num_of_rows) is always included, once
+    row_zone_counts = sorted(set(zone_counts) | {num_of_rows})
+    strategies = [("random", {}), ("steffen", {}), ("outside_in", {"zones": 1})]
+    for far_first in (True, False):
+        strategies += [("zones", {"zones": zones, "far_first": far_first}) for zones in row_zone_counts]
+        strategies += [("outside_in", {"zones": zones, "far_first": far_first}) for zones in zone_counts]
+    strategies += [("reverse_pyramid", {"zones": zones}) for zones in zone_counts]
+    return strategies
+
+
+def compile_orders(family, params, num_of_rows, seats_per_row, samples=1, seed=0):
+    """Row orders of a strategy as an int32 array of shape (samples, num_of_rows * seats_per_row),
+    ready for AirplaneEnv.step_fast or estimate_boarding_batch. Ties within a group are broken
+    with a random key per sample; a strategy without ties always gives one order."""
+    groups = families[family](num_of_rows, seats_per_row, **params).ravel()
+    seat_rows = np.repeat(np.arange(num_of_rows, dtype=np.int32), seats_per_row)
+    if len(np.unique(groups)) == len(groups):
+        samples = 1
+    ties = np.random.default_rng(seed).random((samples, len(groups)))
+    # lexsort sorts by the last key first: by group, then by the random tie-breaker
+    seats = np.lexsort((ties, np.broadcast_to(groups, ties.shape)), axis=-1)
+    return seat_rows[seats]
+
+
+def _rank_chunk(args):
+    strategies, num_of_rows, seats_per_row, samples, seed = args
+    results = []
+    for family, params in strategies:
+        orders = compile_orders(family, params, num_of_rows, seats_per_row, samples, seed)
+        times, rewards = estimate_boarding_batch(orders, num_of_rows)
+        results.append({
+            "strategy": strategy_name(family, params),
+            "family": family,
+            "params": params,
+            "samples": len(orders),
+            "time_mean": float(times.mean()),
+            "time_std": float(times.std()),
+            "reward_mean": float(rewards.mean()),
+            "reward_std": float(rewards.std()),
+        })
+    return results
+
+
+def rank_strategies(num_of_rows, seats_per_row, strategies=None, samples=1000, seed=0, by="reward", workers=None):
+    """Evaluate every strategy on `samples` random tie-breaks and sort them, best first.
+
+    Strategies are dealt round-robin to worker processes, each compiling and estimating its
+    share with the batched estimator. by="reward" sorts by mean total reward, by="time" by mean
+    boarding time.
+    """
+    strategies = strategies or strategy_family(num_of_rows, seats_per_row)
+    workers = min(workers or os.cpu_count(), len(strategies))
+    jobs = [(strategies[i::workers], num_of_rows, seats_per_row, samples, seed) for i in range(workers)]
+    results = []
+    if workers == 1:
+        results = _rank_chunk(jobs[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(_rank_chunk, jobs):
+                results += chunk
+    if by == "time":
+        return sorted(results, key=lambda result: (result["time_mean"], -result["reward_mean"]))
+    return sorted(results, key=lambda result: (-result["reward_mean"], result["time_mean"]))
+
+
+def check_orders(num_of_rows, seats_per_row, strategies=None, seed=0):
+    """Number of strategies whose estimated result differs from stepping AirplaneEnv with the compiled order"""
+    from boarding_estimator import simulate_boarding
+
+    mismatches = 0
+    for family, params in strategies or strategy_family(num_of_rows, seats_per_row):
+        order = compile_orders(family, params, num_of_rows, seats_per_row, seed=seed)
+        times, rewards = estimate_boarding_batch(order, num_of_rows)
+        expected = simulate_boarding(order[0].tolist(), num_of_rows, seats_per_row)
+        mismatches += (int(times[0]), int(rewards[0])) != expected
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank a parametric family of scripted boarding strategies")
+    parser.add_argument("--sizes", nargs="+", default=["10x5", "20x6", "30x6"], help="Cabin sizes, e.g. 10x5 20x6")
+    parser.add_argument("--samples", type=int, default=1000, help="Random tie-breaks per strategy")
+    parser.add_argument("--max-zones", type=int, default=6)
+    parser.add_argument("--by", choices=("reward", "time"), default="reward")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--check", action="store_true", help="Also compare each compiled order against AirplaneEnv")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rows, seats = (int(n) for n in size.split("x"))
+        strategies = strategy_family(rows, seats, args.max_zones)
+        start = time.perf_counter()
+        ranking = rank_strategies(rows, seats, strategies, args.samples, by=args.by, workers=args.workers)
+        print(f"{size}: ranked {len(ranking)} strategies in {time.perf_counter() - start:.2f}s")
+        for result in ranking[:args.top]:
+            print(f"  {result['strategy']:36s} -> Time: {result['time_mean']:6.1f} +- {result['time_std']:4.1f}, "
+                  f"Reward: {result['reward_mean']:7.1f} +- {result['reward_std']:5.1f}")
+        if args.check:
+            print(f"  {check_orders(rows, seats, strategies)} mismatches against AirplaneEnv")
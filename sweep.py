@@ -0,0 +1,225 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+# Values tried for each setting. Cabin sizes are swept like any other setting, but rewards
+# are only compared between trials with the same cabin.
+search_space = {
+    "cabin": [(3, 5), (10, 5)],
+    "ent_coef": [0.0, 0.01, 0.1],
+    "learning_rate": [3e-4, 1e-3],
+    "n_steps": [128, 512],
+    "batch_size": [64],
+    "gamma": [0.99],
+    "n_envs": [4],
+}
+
+cache_dir = os.path.join("sweeps", "cache")
+
+
+def grid_configs(space):
+    keys = sorted(space)
+    for values in itertools.product(*(space[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def random_configs(space, n_trials, seed=0):
+    rng = random.Random(seed)
+    keys = sorted(space)
+    for _ in range(n_trials):
+        yield {k: rng.choice(space[k]) for k in keys}
+
+
+def trial_hash(config, total_timesteps, eval_freq):
+    """Cache key of a trial: its config (which includes the cabin) and its training budget"""
+    key = {"config": config, "total_timesteps": total_timesteps, "eval_freq": eval_freq}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_result(cache_dir, config, total_timesteps, eval_freq):
+    path = os.path.join(cache_dir, f"{trial_hash(config, total_timesteps, eval_freq)}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def _write_json(path, data):
+    # Write then rename so concurrent readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _store_result(cache_dir, result):
+    name = trial_hash(result["config"], result["total_timesteps"], result["eval_freq"])
+    _write_json(os.path.join(cache_dir, f"{name}.json"), result)
+    # The finished result replaces the curve published while training
+    try:
+        os.remove(os.path.join(cache_dir, f"{name}.partial.json"))
+    except FileNotFoundError:
+        pass
+
+
+def _peer_curves(cache_dir, cabin, eval_freq, exclude=None):
+    """Eval curves of other trials on the same cabin and eval interval: finished ones, and the
+    partial curves that running trials publish after every eval"""
+    curves = {}
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        trial = name.split(".")[0]
+        if trial == exclude or (name.endswith(".partial.json") and trial in curves):
+            continue
+        try:
+            with open(os.path.join(cache_dir, name)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if tuple(result["config"]["cabin"]) == tuple(cabin) and result.get("eval_freq") == eval_freq:
+            curves[trial] = [reward for _, reward in result["curve"]]
+    return list(curves.values())
+
+
+class MedianStoppingCallback(BaseCallback):
+    """Stop a trial whose eval reward is below the median of its peers at the same eval.
+
+    Used as `callback_after_eval` of MaskableEvalCallback. After every eval the trial's curve
+    so far is published to the sweep cache as <hash>.partial.json, and peers are read from the
+    cache: trials running at the same time through their partial curves, finished trials of
+    this and earlier sweeps through their results. Only trials with the same cabin and eval
+    interval are compared.
+    """
+
+    def __init__(self, cache_dir, config, total_timesteps, eval_freq, min_trials=3, warmup_evals=2, verbose=0):
+        super().__init__(verbose=verbose)
+        self.cache_dir = cache_dir
+        self.config = config
+        self.eval_freq = eval_freq
+        self.trial = trial_hash(config, total_timesteps, eval_freq)
+        self.partial_path = os.path.join(cache_dir, f"{self.trial}.partial.json")
+        self.min_trials = min_trials
+        self.warmup_evals = warmup_evals
+        self.curve = []
+        self.pruned = False
+
+    def _on_step(self):
+        self.curve.append((self.num_timesteps, float(self.parent.last_mean_reward)))
+        _write_json(self.partial_path, {"config": self.config, "eval_freq": self.eval_freq, "curve": self.curve})
+        eval_idx = len(self.curve) - 1
+        if eval_idx < self.warmup_evals:
+            return True
+
+        curves = _peer_curves(self.cache_dir, self.config["cabin"], self.eval_freq, exclude=self.trial)
+        peers = [curve[eval_idx] for curve in curves if len(curve) > eval_idx]
+        if len(peers) >= self.min_trials and self.curve[-1][1] < np.median(peers):
+            if self.verbose >= 1:
+                print(f"Pruning trial at eval {eval_idx}: {self.curve[-1][1]:.2f} < median {np.median(peers):.2f}")
+            self.pruned = True
+            return False
+        return True
+
+
+def run_trial(config, total_timesteps, eval_freq, cache_dir, threads=1, min_trials=3):
+    """Train one configuration on CPU and store its eval curve in the cache"""
+    import torch
+    from sb3_contrib.common.maskable.callbacks import MaskableEvalCallback
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from agent import make_model
+    from airplane_boarding import AirplaneEnv
+
+    torch.set_num_threads(threads)
+    rows, seats = config["cabin"]
+    env_kwargs = {"num_of_rows": rows, "seats_per_row": seats}
+    eval_env = make_vec_env(AirplaneEnv, n_envs=1, env_kwargs=env_kwargs, vec_env_cls=DummyVecEnv)
+
+    # Same env and model construction as agent.train, so the best config can be passed to it as is
+    ppo_kwargs = {k: v for k, v in config.items() if k not in ("cabin", "n_envs")}
+    env, model = make_model(rows, seats, config["n_envs"], DummyVecEnv, "cpu", seed=0, **ppo_kwargs)
+
+    stopper = MedianStoppingCallback(cache_dir, config, total_timesteps, eval_freq, min_trials=min_trials)
+    # The simulator is deterministic, so one deterministic eval episode is exact
+    eval_callback = MaskableEvalCallback(eval_env, n_eval_episodes=1, eval_freq=max(eval_freq // config["n_envs"], 1),
+                                         callback_after_eval=stopper, verbose=0)
+    model.learn(total_timesteps=total_timesteps, callback=eval_callback)
+    env.close()
+    eval_env.close()
+
+    result = {
+        "config": config,
+        "curve": stopper.curve,
+        "status": "pruned" if stopper.pruned else "complete",
+        "best_reward": max((reward for _, reward in stopper.curve), default=None),
+        "timesteps": model.num_timesteps,
+        "total_timesteps": total_timesteps,
+        "eval_freq": eval_freq,
+    }
+    _store_result(cache_dir, result)
+    return result
+
+
+def run_sweep(configs, total_timesteps=100_000, eval_freq=5_000, core_budget=None, threads_per_trial=1,
+              cache_dir=cache_dir, min_trials=3):
+    """Run every config not already in the cache, `core_budget // threads_per_trial` at a time"""
+    os.makedirs(cache_dir, exist_ok=True)
+    core_budget = core_budget or os.cpu_count()
+    max_workers = max(core_budget // threads_per_trial, 1)
+
+    results, todo = [], []
+    for config in configs:
+        cached = load_result(cache_dir, config, total_timesteps, eval_freq)
+        if cached is not None:
+            results.append(cached)
+        elif config not in todo:
+            todo.append(config)
+    print(f"{len(results)} cached trials, {len(todo)} to run on {max_workers} workers")
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(run_trial, config, total_timesteps, eval_freq, cache_dir, threads_per_trial,
+                                   min_trials) for config in todo]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"{result['status']:8s} best={result['best_reward']} {result['config']}")
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search PPO hyperparameters and cabin sizes")
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=10, help="Number of random trials")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timesteps", type=int, default=100_000)
+    parser.add_argument("--eval-freq", type=int, default=5_000, help="Eval interval in env steps")
+    parser.add_argument("--cores", type=int, default=None, help="Core budget (default: all)")
+    parser.add_argument("--threads-per-trial", type=int, default=1)
+    parser.add_argument("--cache-dir", default=cache_dir)
+    args = parser.parse_args()
+
+    if args.mode == "grid":
+        configs = list(grid_configs(search_space))
+    else:
+        configs = list(random_configs(search_space, args.trials, args.seed))
+
+    results = run_sweep(configs, args.timesteps, args.eval_freq, args.cores, args.threads_per_trial, args.cache_dir)
+
+    print("\nBest per cabin:")
+    for cabin in sorted({tuple(r["config"]["cabin"]) for r in results}):
+        ranked = sorted((r for r in results if tuple(r["config"]["cabin"]) == cabin and r["best_reward"] is not None),
+                        key=lambda r: r["best_reward"], reverse=True)
+        if ranked:
+            print(f"{cabin}: {ranked[0]['best_reward']:.2f} {ranked[0]['config']}")
+
+
+if __name__ == "__main__":
+    main()
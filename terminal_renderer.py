@@ -0,0 +1,60 @@
+import sys
+
+
+class TerminalRenderer:
+    """Writes terminal frames with a single write call per frame.
+
+    A frame is a list of lines. By default frames are appended one after another, like the
+    old print-based rendering. With `ansi_redraw`, the cursor is moved back to the top of the
+    previous frame and only lines that changed are rewritten, so the picture updates in place.
+    `render_every` draws only every N-th tick; callers force the last frame of an episode.
+    """
+
+    def __init__(self, render_every=1, ansi_redraw=False, stream=None):
+        assert render_every >= 1
+        self.render_every = render_every
+        self.ansi_redraw = ansi_redraw
+        self.stream = stream
+        self.reset()
+
+    def reset(self):
+        """Start a new episode: the next tick is drawn and nothing is redrawn in place"""
+        self.ticks = 0
+        self.previous = None
+
+    def tick(self, force=False):
+        """Count a tick and return whether its frame should be built and drawn"""
+        due = force or self.ticks % self.render_every == 0
+        self.ticks += 1
+        return due
+
+    def draw(self, lines):
+        stream = self.stream or sys.stdout
+        if not self.ansi_redraw or self.previous is None:
+            stream.write("\n".join(lines) + "\n")
+        else:
+            stream.write(self._redraw(self.previous, lines))
+        stream.flush()
+        if self.ansi_redraw:
+            self.previous = lines
+
+    @staticmethod
+    def _redraw(previous, lines):
+        # Cursor to the first line of the previous frame, then skip unchanged lines and
+        # clear and rewrite changed ones
+        out = [f"\x1b[{len(previous)}F"] if previous else []
+        skipped = 0
+        for i, line in enumerate(lines):
+            if i < len(previous) and previous[i] == line:
+                skipped += 1
+                continue
+            if skipped:
+                out.append(f"\x1b[{skipped}E")
+                skipped = 0
+            out.append(f"\x1b[2K{line}\n")
+        if skipped:
+            out.append(f"\x1b[{skipped}E")
+        if len(lines) < len(previous):
+            # Clear what is left of a longer previous frame
+            out.append("\x1b[J")
+        return "".join(out)
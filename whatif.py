@@ -0,0 +1,176 @@
+import argparse
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from airplane_boarding import AirplaneEnv
+
+
+class _Node:
+    __slots__ = ("children", "snapshot", "parent", "action")
+
+    def __init__(self, parent=None, action=None):
+        self.children = {}
+        self.snapshot = None
+        self.parent = parent
+        self.action = action
+
+
+class WhatIfEvaluator:
+    """Evaluates row orders by resuming from snapshots of orders it has already run.
+
+    Evaluated orders are kept in a prefix trie with one edge per action. Every
+    `checkpoint_every` actions the trie node holds a snapshot of the env after that prefix:
+    get_state(), reward so far and boarding time. evaluate() walks the trie along the new
+    order, restores the deepest snapshot on the way and only simulates the rest, so changing
+    an order after position k costs about len(order) - k steps. At most `max_snapshots`
+    snapshots are kept; the least recently used go first, together with trie branches that no
+    longer lead to any snapshot.
+
+    Snapshots do not hold per-passenger durations of the lobby, so sampled stow_time and
+    walk_time are only consistent within one reset(); use constant durations.
+    """
+
+    def __init__(self, num_of_rows=10, seats_per_row=5, checkpoint_every=4, max_snapshots=4096, **env_kwargs):
+        assert checkpoint_every >= 1 and max_snapshots >= 1
+        self.env = AirplaneEnv(num_of_rows=num_of_rows, seats_per_row=seats_per_row, **env_kwargs)
+        self.env.reset()
+        self.checkpoint_every = checkpoint_every
+        self.max_snapshots = max_snapshots
+        self.root = _Node()
+        self.snapshots = OrderedDict()
+        self.evaluations = self.steps = self.steps_saved = 0
+
+    def evaluate(self, order):
+        """Returns (boarding_time, total_reward) of the row order, as AirplaneEnv.step would"""
+        env = self.env
+        node, depth, resume = self.root, 0, None
+        for i, row_num in enumerate(order):
+            node = node.children.get(row_num)
+            if node is None:
+                break
+            if node.snapshot is not None:
+                resume, depth = node, i + 1
+
+        if resume is None:
+            env.reset()
+            total_reward = 0
+            node = self.root
+        else:
+            state, total_reward, env.boarding_time = resume.snapshot
+            env.set_state(state)
+            self.snapshots.move_to_end(id(resume))
+            node = resume
+
+        terminated = env.terminated
+        created = None
+        try:
+            for i in range(depth, len(order)):
+                if terminated:
+                    raise ValueError("Order is longer than the episode")
+                reward, terminated = env.step_fast(order[i])
+                total_reward += reward
+                child = node.children.get(order[i])
+                if child is None:
+                    child = node.children[order[i]] = _Node(node, order[i])
+                    created = created or child
+                node = child
+                if (i + 1) % self.checkpoint_every == 0 and not terminated and node.snapshot is None:
+                    self._store(node, (env.get_state(), total_reward, env.boarding_time))
+            # With max_drain_ticks set, the last action leaves part of the drain to the next steps
+            while env.drain_pending:
+                reward, terminated = env.step_fast(0)
+                total_reward += reward
+            if not terminated:
+                raise ValueError("Order does not board every passenger")
+        except Exception:
+            if created is not None:
+                self._discard(created)
+            raise
+        self._prune(node)
+
+        self.evaluations += 1
+        self.steps += len(order) - depth
+        self.steps_saved += depth
+        return env.boarding_time, total_reward
+
+    def _store(self, node, snapshot):
+        node.snapshot = snapshot
+        self.snapshots[id(node)] = node
+        if len(self.snapshots) > self.max_snapshots:
+            _, oldest = self.snapshots.popitem(last=False)
+            oldest.snapshot = None
+            self._prune(oldest)
+
+    def _discard(self, node):
+        """Remove the branch a failed evaluation added from `node` on, with its snapshots"""
+        parent = node.parent
+        del parent.children[node.action]
+        while node is not None:
+            if node.snapshot is not None:
+                del self.snapshots[id(node)]
+            node = next(iter(node.children.values()), None)
+        self._prune(parent)
+
+    @staticmethod
+    def _prune(node):
+        # Drop trie nodes that lead to no snapshot, from `node` towards the root
+        while node.parent is not None and node.snapshot is None and not node.children:
+            del node.parent.children[node.action]
+            node = node.parent
+
+    def stats(self):
+        return {
+            "evaluations": self.evaluations,
+            "snapshots": len(self.snapshots),
+            "steps_per_evaluation": self.steps / max(self.evaluations, 1),
+            "steps_saved_share": self.steps_saved / max(self.steps + self.steps_saved, 1),
+        }
+
+
+def late_swap_search(evaluator, order, iterations=1000, tail=0.25, seed=0):
+    """Local search that swaps two passengers in the last `tail` share of the order and keeps
+    the swap when the total reward does not drop. Returns (order, boarding_time, reward)."""
+    rng = np.random.default_rng(seed)
+    order = list(order)
+    boarding_time, best = evaluator.evaluate(order)
+    first = int(len(order) * (1 - tail))
+    for _ in range(iterations):
+        i, j = sorted(rng.choice(np.arange(first, len(order)), size=2, replace=False))
+        if order[i] == order[j]:
+            continue
+        order[i], order[j] = order[j], order[i]
+        candidate_time, reward = evaluator.evaluate(order)
+        if reward >= best:
+            boarding_time, best = candidate_time, reward
+        else:
+            order[i], order[j] = order[j], order[i]
+    return order, boarding_time, best
+
+
+if __name__ == "__main__":
+    from demonstrations import RecordingEnv, scripted
+
+    parser = argparse.ArgumentParser(description="Local search on a boarding order with prefix-cached evaluation")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--seats", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--tail", type=float, default=0.25)
+    parser.add_argument("--checkpoint-every", type=int, default=4)
+    args = parser.parse_args()
+
+    # Start from WilMA's order of rows
+    env = RecordingEnv(num_of_rows=args.rows, seats_per_row=args.seats)
+    scripted["wilma"](env)
+    start_order = env.actions
+
+    for name, every in (("replay from reset", 10 ** 9), ("prefix cached", args.checkpoint_every)):
+        evaluator = WhatIfEvaluator(args.rows, args.seats, checkpoint_every=every)
+        start = time.perf_counter()
+        order, boarding_time, reward = late_swap_search(evaluator, start_order, args.iterations, args.tail)
+        elapsed = time.perf_counter() - start
+        stats = evaluator.stats()
+        print(f"{name:18s} -> Time: {boarding_time}, Reward: {reward}, "
+              f"{elapsed / stats['evaluations'] * 1e6:.0f} us per evaluation, "
+              f"{stats['steps_per_evaluation']:.1f} steps per evaluation, {stats['snapshots']} snapshots")
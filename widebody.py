@@ -0,0 +1,220 @@
+import argparse
+import time
+from collections import deque
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from gymnasium.envs.registration import register, registry
+
+from airplane_boarding import PassengerStatus
+
+if "airplane-boarding-widebody-v0" not in registry:
+    register(
+        id="airplane-boarding-widebody-v0",
+        entry_point="widebody:WideBodyEnv",
+    )
+
+MOVING, STALLED, STOWING = PassengerStatus.MOVING.value, PassengerStatus.STALLED.value, PassengerStatus.STOWING.value
+EMPTY = -1
+
+
+class WideBodyEnv(gym.Env):
+    """Boarding with several aisles and doors, following AirplaneEnv's tick rules in every lane.
+
+    Seat columns are split evenly between the aisles, and with two doors the rows are split
+    between them: "front" is the door AirplaneEnv uses (next to the highest row number) and
+    "rear" the one next to row 0. Every (aisle, door) pair is a lane: a line of aisle slots
+    from the last row it serves to the door, fed by its own door queue. Lanes never interact.
+
+    The action picks a (row, aisle) group, encoded as row * num_aisles + aisle, and boards its
+    next passenger. The slots of all lanes are laid end to end in flat arrays, and a tick moves
+    every lane at once: a passenger moves when the nearest slot ahead that holds no passenger
+    able to move is empty, which is the same outcome as AirplaneEnv stepping the line front
+    to back. With one aisle and the front door only it matches AirplaneEnv tick for tick.
+
+    The observation has (seat, status) per aisle slot (-1 when empty), the queue length of
+    every lane and the passengers left in every group.
+    """
+    metadata = {"render_modes": []}
+
+    def __init__(self, render_mode=None, num_of_rows=50, seats_per_row=9, num_aisles=2, doors=("front", "rear")):
+        assert render_mode is None, "WideBodyEnv has no rendering"
+        assert 1 <= num_aisles <= seats_per_row and doors and set(doors) <= {"front", "rear"}
+        assert num_of_rows >= len(doors), "Every door needs at least one row"
+        self.num_of_rows = num_of_rows
+        self.seats_per_row = seats_per_row
+        self.num_of_seats = num_of_rows * seats_per_row
+        self.num_aisles = num_aisles
+        self.doors = tuple(doors)
+
+        # Rows served by each door, from the far end of the lane to the door; the front door
+        # always covers the highest rows
+        split = num_of_rows // 2 if len(self.doors) == 2 else (0 if self.doors == ("front",) else num_of_rows)
+        door_rows = {"front": range(split, num_of_rows), "rear": range(split - 1, -1, -1)}
+        self.lanes = [(aisle, door) for door in self.doors for aisle in range(num_aisles)]
+
+        # Per seat: its lane and the slot of its row; per group (action): its seats in boarding order
+        self.seat_lane = [0] * self.num_of_seats
+        self.seat_target = [0] * self.num_of_seats
+        self.groups = [[] for _ in range(num_of_rows * num_aisles)]
+        lane_start, self.door_slot = [], []
+        num_slots = 0
+        for lane, (aisle, door) in enumerate(self.lanes):
+            lane_start.append(num_slots)
+            for row in door_rows[door]:
+                for column in range(seats_per_row):
+                    if column * num_aisles // seats_per_row == aisle:
+                        seat = row * seats_per_row + column
+                        self.seat_lane[seat] = lane
+                        self.seat_target[seat] = num_slots
+                        self.groups[row * num_aisles + aisle].append(seat)
+                num_slots += 1
+            self.door_slot.append(num_slots - 1)
+        self.group_seats = [tuple(seats) for seats in self.groups]
+
+        self.slot_index = np.arange(num_slots)
+        # The far end of a lane never moves on, which also keeps lanes from running into each other
+        self.movable_slot = np.ones(num_slots, dtype=bool)
+        self.movable_slot[lane_start] = False
+        self.slot_seat = np.full(num_slots, -1, dtype=np.int64)
+        self.slot_target = np.full(num_slots, -1, dtype=np.int64)
+        self.slot_status = np.full(num_slots, EMPTY, dtype=np.int64)
+        self.queues = [deque() for _ in self.lanes]
+        self.queue_status = [MOVING] * len(self.lanes)
+
+        self.action_space = spaces.Discrete(num_of_rows * num_aisles)
+        obs_size = 2 * num_slots + len(self.lanes) + len(self.groups)
+        self.observation_space = spaces.Box(low=-1, high=self.num_of_seats, shape=(obs_size,), dtype=np.int32)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        for group, seats in zip(self.groups, self.group_seats):
+            group[:] = seats
+        self.passengers_left = self.num_of_seats
+        self.slot_seat.fill(-1)
+        self.slot_target.fill(-1)
+        self.slot_status.fill(EMPTY)
+        for queue in self.queues:
+            queue.clear()
+        self.queue_status = [MOVING] * len(self.lanes)
+        self.num_seated = self.boarding_time = 0
+        self.terminated = False
+        return self._get_observation(), {}
+
+    def _get_observation(self):
+        return np.concatenate([
+            self.slot_seat,
+            self.slot_status,
+            [len(queue) for queue in self.queues],
+            [len(group) for group in self.groups],
+        ]).astype(np.int32)
+
+    def action_masks(self):
+        return [bool(group) for group in self.groups]
+
+    def step(self, action):
+        reward, terminated = self.step_fast(action)
+        return self._get_observation(), reward, terminated, False, {"boarding_time": self.boarding_time}
+
+    def step_fast(self, action):
+        """Same transition as step() without building the observation. Returns (reward, terminated)."""
+        seat = self.groups[action].pop()
+        self.passengers_left -= 1
+        self.queues[self.seat_lane[seat]].append(seat)
+
+        if self.passengers_left > 0:
+            reward = self._tick()
+        else:
+            reward = 0
+            while self.num_seated < self.num_of_seats:
+                reward += self._tick()
+        self.terminated = self.num_seated == self.num_of_seats
+        return reward, self.terminated
+
+    def _tick(self):
+        seat, target, status = self.slot_seat, self.slot_target, self.slot_status
+
+        # Passengers at their row start stowing, or sit down if they stowed last tick
+        at_row = target == self.slot_index
+        seated = at_row & (status == STOWING)
+        num_seated = np.count_nonzero(seated)
+        if num_seated:
+            seat[seated] = target[seated] = -1
+            status[seated] = EMPTY
+            at_row &= ~seated
+            self.num_seated += num_seated
+        status[at_row] = STOWING
+
+        # Everyone who can move does so if the nearest slot ahead without such a passenger is free
+        can_move = (status == MOVING) | (status == STALLED)
+        can_move &= self.movable_slot
+        blocker = np.maximum.accumulate(np.where(can_move, -1, self.slot_index))
+        moves = can_move.copy()
+        moves[1:] &= status[blocker[:-1]] == EMPTY
+        status[can_move & ~moves] = STALLED
+        moved = np.flatnonzero(moves)
+        if len(moved):
+            moved_seat, moved_target = seat[moved], target[moved]
+            seat[moved] = target[moved] = -1
+            status[moved] = EMPTY
+            seat[moved - 1] = moved_seat
+            target[moved - 1] = moved_target
+            status[moved - 1] = MOVING
+
+        # Door queues step into their lane as a block when the door slot is free
+        queued = 0
+        for lane, queue in enumerate(self.queues):
+            if not queue:
+                continue
+            door = self.door_slot[lane]
+            if status[door] == EMPTY:
+                entering = queue.popleft()
+                seat[door] = entering
+                target[door] = self.seat_target[entering]
+                status[door] = MOVING
+                self.queue_status[lane] = MOVING
+                queued += len(queue)
+            else:
+                self.queue_status[lane] = STALLED
+                queued -= len(queue)
+
+        self.boarding_time += 1
+        return np.count_nonzero(status == MOVING) - np.count_nonzero(status == STALLED) + queued
+
+
+def outside_in_back_to_front(env):
+    """Window seats first, back rows first within each column, for both doors at once"""
+    groups_by_column = sorted(range(env.num_of_rows * env.num_aisles),
+                              key=lambda group: (group % env.num_aisles, -(group // env.num_aisles)))
+    order = []
+    for group in groups_by_column:
+        order += [group] * len(env.group_seats[group])
+    return order
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time wide-body boarding episodes")
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--seats", type=int, default=8)
+    parser.add_argument("--aisles", type=int, default=2)
+    parser.add_argument("--doors", nargs="+", default=["front", "rear"], choices=["front", "rear"])
+    parser.add_argument("--episodes", type=int, default=50)
+    args = parser.parse_args()
+
+    env = WideBodyEnv(num_of_rows=args.rows, seats_per_row=args.seats, num_aisles=args.aisles, doors=args.doors)
+    rng = np.random.default_rng(0)
+    for name in ("random", "back-to-front"):
+        start = time.perf_counter()
+        for _ in range(args.episodes):
+            env.reset()
+            if name == "random":
+                total_reward = 0
+                while not env.terminated:
+                    reward, _ = env.step_fast(int(rng.choice(np.flatnonzero(env.action_masks()))))
+                    total_reward += reward
+            else:
+                total_reward = sum(env.step_fast(action)[0] for action in outside_in_back_to_front(env))
+        elapsed = (time.perf_counter() - start) / args.episodes
+        print(f"{name:14s} {env.num_of_seats} seats, {len(env.lanes)} lanes -> Time: {env.boarding_time}, "
+              f"Reward: {total_reward}, {elapsed * 1e3:.1f} ms per episode")